@@ -0,0 +1,74 @@
+import glob
+import json
+import os
+import subprocess
+import sys
+import time
+
+from crossword import Crossword
+from search import STRATEGIES, SearchCreator, make_creator
+
+# Seconds a strategy gets on one puzzle before it is stopped
+TIMEOUT = 60
+
+
+def main():
+    if len(sys.argv) == 5 and sys.argv[1] == "--run":
+        print(json.dumps(run_strategy(*sys.argv[2:])))
+        return
+    if len(sys.argv) > 2:
+        sys.exit("Usage: python benchmark.py [data]")
+
+    directory = sys.argv[1] if len(sys.argv) == 2 else "data"
+    structures = sorted(glob.glob(os.path.join(directory, "structure*.txt")))
+    words = sorted(glob.glob(os.path.join(directory, "words*.txt")))
+    print(f"{'structure':>15} {'words':>10} {'strategy':>10} "
+          f"{'seconds':>8} {'nodes':>8} {'failures':>8} {'restarts':>8}  result")
+    for structure in structures:
+        for vocabulary in words:
+            for strategy in STRATEGIES:
+                result = measure(strategy, structure, vocabulary)
+                print(f"{os.path.basename(structure):>15} "
+                      f"{os.path.basename(vocabulary):>10} {strategy:>10} "
+                      f"{result['seconds']:>8.3f} {result['nodes']:>8} "
+                      f"{result['failures']:>8} {result['restarts']:>8}  "
+                      f"{result['result']}")
+
+
+def run_strategy(strategy, structure, words):
+    """
+    Solve one puzzle with one strategy in this process and return its
+    wall time, search statistics and outcome.
+    """
+    crossword = Crossword(structure, words)
+    creator = make_creator(crossword, strategy)
+    start = time.perf_counter()
+    assignment = creator.solve()
+    seconds = time.perf_counter() - start
+    searched = isinstance(creator, SearchCreator)
+    return {
+        "seconds": seconds,
+        "nodes": creator.nodes if searched else "-",
+        "failures": creator.failures if searched else "-",
+        "restarts": creator.restarts_made if searched else "-",
+        "result": "solved" if assignment is not None else "no solution",
+    }
+
+
+def measure(strategy, structure, words):
+    """
+    Run `run_strategy` in a fresh process, so that one that thrashes
+    can be stopped after TIMEOUT seconds.
+    """
+    try:
+        output = subprocess.run(
+            [sys.executable, __file__, "--run", strategy, structure, words],
+            capture_output=True, text=True, check=True, timeout=TIMEOUT)
+    except subprocess.TimeoutExpired:
+        return {"seconds": TIMEOUT, "nodes": "-", "failures": "-",
+                "restarts": "-", "result": "timed out"}
+    return json.loads(output.stdout)
+
+
+if __name__ == "__main__":
+    main()
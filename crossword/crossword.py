@@ -108,26 +108,48 @@ class Crossword():
         # For any pair of variables v1, v2, their overlap is either:
         #    None, if the two variables do not overlap; or
         #    (i, j), where v1's ith character overlaps v2's jth character
-        self.overlaps = dict()
-        for v1 in self.variables:
-            for v2 in self.variables:
-                if v1 == v2:
-                    continue
-                cells1 = v1.cells
-                cells2 = v2.cells
-                intersection = set(cells1).intersection(cells2)
-                if not intersection:
-                    self.overlaps[v1, v2] = None
-                else:
-                    intersection = intersection.pop()
-                    self.overlaps[v1, v2] = (
-                        cells1.index(intersection),
-                        cells2.index(intersection)
-                    )
+        # Only cells shared by two variables give overlaps, so they are
+        # found from a map of each cell to the variables through it
+        cells = dict()
+        for var in self.variables:
+            for k, cell in enumerate(var.cells):
+                cells.setdefault(cell, []).append((var, k))
+        self.overlaps = Overlaps()
+        adjacency = {var: set() for var in self.variables}
+        for crossing in cells.values():
+            for v1, k1 in crossing:
+                for v2, k2 in crossing:
+                    if v1 != v2:
+                        self.overlaps[v1, v2] = (k1, k2)
+                        adjacency[v1].add(v2)
+        self.adjacency = {
+            var: frozenset(neighbors) for var, neighbors in adjacency.items()
+        }
+
+        # Index words by length, and by the letter at each position
+        # For a word length, `self.vocabulary[length]` lists the words in
+        # sorted order, so word k of that length can stand for bit k of a
+        # bitset; `self.positions[length, position]` maps each letter to
+        # the bitset of those words with that letter at that position
+        self.vocabulary = {var.length: [] for var in self.variables}
+        for word in sorted(self.words):
+            self.vocabulary.setdefault(len(word), []).append(word)
+        self.positions = dict()
+        for length, words in self.vocabulary.items():
+            for position in range(length):
+                self.positions[length, position] = dict()
+            for k, word in enumerate(words):
+                for position, letter in enumerate(word):
+                    letters = self.positions[length, position]
+                    letters[letter] = letters.get(letter, 0) | (1 << k)
 
     def neighbors(self, var):
         """Given a variable, return set of overlapping variables."""
-        return set(
-            v for v in self.variables
-            if v != var and self.overlaps[v, var]
-        )
+        return self.adjacency[var]
+
+
+class Overlaps(dict):
+    """Overlaps by pair of variables, None for pairs that do not overlap."""
+
+    def __missing__(self, key):
+        return None
@@ -1,6 +1,7 @@
+import bisect
+import collections
 import sys
 import random
-import copy
 
 from crossword import *
 
@@ -10,12 +11,50 @@ class CrosswordCreator():
     def __init__(self, crossword):
         """
         Create new CSP crossword generate.
+
+        Each variable's domain is a bitset over the words of its
+        length: bit k of `self.domains[var]` is set if
+        `self.vocabulary[var.length][k]` is still possible. Changes to
+        domains are recorded on `self.trail`, so that backtracking can
+        undo them instead of copying every domain.
         """
         self.crossword = crossword
+        self.vocabulary = crossword.vocabulary
         self.domains = {
-            var: self.crossword.words.copy()
+            var: (1 << len(self.vocabulary[var.length])) - 1
             for var in self.crossword.variables
         }
+        self.trail = []
+
+    def domain_size(self, var):
+        """
+        Return the number of words left in the domain of `var`.
+        """
+        return popcount(self.domains[var])
+
+    def domain_words(self, var):
+        """
+        Return the words left in the domain of `var`.
+        """
+        words = self.vocabulary[var.length]
+        return [words[k] for k in bits(self.domains[var])]
+
+    def set_domain(self, var, domain):
+        """
+        Replace the domain of `var` with the bitset `domain`, recording
+        the old one on the trail.
+        """
+        if domain != self.domains[var]:
+            self.trail.append((var, self.domains[var]))
+            self.domains[var] = domain
+
+    def undo(self, mark):
+        """
+        Restore every domain changed since the trail had length `mark`.
+        """
+        while len(self.trail) > mark:
+            var, domain = self.trail.pop()
+            self.domains[var] = domain
 
     def letter_grid(self, assignment):
         """
@@ -92,7 +131,8 @@ class CrosswordCreator():
         Enforce node and arc consistency, and then solve the CSP.
         """
         self.enforce_node_consistency()
-        self.ac3()
+        if not self.ac3():
+            return None
         return self.backtrack(dict())
 
     def enforce_node_consistency(self):
@@ -100,13 +140,13 @@ class CrosswordCreator():
         Update `self.domains` such that each variable is node-consistent.
         (Remove any values that are inconsistent with a variable's unary
          constraints; in this case, the length of the word.)
+
+        Domains only index words of their variable's length, so this
+        just clamps each domain to its vocabulary.
         """
         for var in self.crossword.variables:
-            buf_not_dom = set()  # buffer for variable to be deleted from domains
-            for dom in self.domains[var]:
-                if len(dom) != var.length:
-                    buf_not_dom.add(dom)
-            self.domains[var].difference_update(buf_not_dom)
+            words = self.vocabulary[var.length]
+            self.set_domain(var, self.domains[var] & ((1 << len(words)) - 1))
 
     def revise(self, x, y):
         """
@@ -117,27 +157,28 @@ class CrosswordCreator():
         Return True if a revision was made to the domain of `x`; return
         False if no revision was made.
         """
-        for val in self.domains[x]:
-            overlap = self.crossword.overlaps[x, y]
-            if overlap == None:  # if x and y has no overlap, return False
-                return False
-            else:
-                x_char = overlap[0]
-                y_char = overlap[1]
-                check_remove = False  # to check if there's value removed
-                buf = set()  # buffer for value to be removed from domains
-                for val_x in self.domains[x]:
-                    check = False
-                    for val_y in self.domains[y]:
-                        if val_x[x_char] == val_y[y_char]:
-                            check = True
-                            break
-                    if check == False:
-                        buf.add(val_x)
-                        check_remove = True
-        if check_remove == True:
-            self.domains[x].difference_update(buf)
-            return True
+        domain = self.supported(x, y)
+        if domain == self.domains[x]:
+            return False
+        self.set_domain(x, domain)
+        return True
+
+    def supported(self, x, y):
+        """
+        Return the bitset of words in the domain of `x` that agree with
+        some word in the domain of `y` where the two overlap.
+        """
+        overlap = self.crossword.overlaps[x, y]
+        if overlap is None:
+            return self.domains[x]
+        i, j = overlap
+        # words of x supported by a letter some word of y still has
+        x_letters = self.crossword.positions[x.length, i]
+        support = 0
+        for letter, words in self.crossword.positions[y.length, j].items():
+            if words & self.domains[y]:
+                support |= x_letters.get(letter, 0)
+        return self.domains[x] & support
 
     def ac3(self, arcs=None):
         """
@@ -149,22 +190,42 @@ class CrosswordCreator():
         return False if one or more domains end up empty.
         """
         # if arcs is None, begin with initial list of all arcs in the problem
-        if arcs == None:
-            arcs = []
-            for x in self.crossword.variables:
-                for y in self.crossword.neighbors(x):
-                    arcs.append((x, y))
-        # applying arc consistency
-        while arcs != []:
-            pair = arcs.pop(0)
-            if self.revise(pair[0], pair[1]):
-                if len(self.domains[pair[0]]) == 0:
-                    return False
-                for z in self.crossword.neighbors(pair[0]):
-                    if z != pair[1]:
-                        arcs.append((z, pair[0]))
-        return True                
-        
+        if arcs is None:
+            arcs = [
+                (x, y)
+                for x in self.crossword.variables
+                for y in self.crossword.neighbors(x)
+            ]
+        return self.propagate(arcs) is None
+
+    def propagate(self, arcs, spread=True):
+        """
+        Revise every arc in `arcs` and, if `spread`, every arc into a
+        variable whose domain shrinks, until nothing changes. Return
+        the arc (x, y) whose revision emptied the domain of x, or None
+        if no domain was emptied.
+        """
+        # work through a queue holding each arc at most once
+        queue = collections.deque()
+        queued = set()
+        for arc in arcs:
+            if arc not in queued:
+                queue.append(arc)
+                queued.add(arc)
+        while queue:
+            x, y = queue.popleft()
+            queued.discard((x, y))
+            if self.revise(x, y):
+                if self.domains[x] == 0:
+                    return x, y
+                if not spread:
+                    continue
+                for z in self.crossword.neighbors(x):
+                    if z != y and (z, x) not in queued:
+                        queue.append((z, x))
+                        queued.add((z, x))
+        return None
+
     def assignment_complete(self, assignment):
         """
         Return True if `assignment` is complete (i.e., assigns a value to each
@@ -173,41 +234,24 @@ class CrosswordCreator():
         if set(assignment.keys()) == self.crossword.variables:
             return True
         return False
-        
+
     def consistent(self, assignment):
         """
         Return True if `assignment` is consistent (i.e., words fit in crossword
         puzzle without conflicting characters); return False otherwise.
         """
         # check if all values are distinct
-        assignment_set = set()
-        assignment_list = []
-        for var in assignment.keys():
-            var_assignment = assignment[var]
-            assignment_set.add(var_assignment)
-            assignment_list.append(var_assignment)
-            if len(var_assignment) != var.length: # check if every value is the correct length
-                # print("consistent error: value is not the correct length")
-                return False
-        if len(assignment_set) != len(assignment_list):
-            # print("consistent error: all values are not distinct")
+        if len(set(assignment.values())) != len(assignment):
             return False
-        # check if no conflict between neighboring variables
-        for var in assignment.keys():
-            neighbors = self.crossword.neighbors(var)
-            for neighbor in neighbors:
-                if neighbor in assignment.keys():
-                    overlap = self.crossword.overlaps[var, neighbor]
-                    overlap_var = overlap[0]
-                    overlap_neighbor = overlap[1]
-                    domain_var = assignment[var]
-                    domain_neighbor = assignment[neighbor]
-                    for v in self.domains[var]:
-                        domain_var = v
-                    for v in self.domains[neighbor]:
-                        domain_neighbor = v
-                    if domain_var[overlap_var] != domain_neighbor[overlap_neighbor]:
-                        # print("consistent error: conflict between neighboring variables")
+        for var, word in assignment.items():
+            # check if every value is the correct length
+            if len(word) != var.length:
+                return False
+            # check if no conflict between neighboring variables
+            for neighbor in self.crossword.neighbors(var):
+                if neighbor in assignment:
+                    i, j = self.crossword.overlaps[var, neighbor]
+                    if word[i] != assignment[neighbor][j]:
                         return False
         return True
 
@@ -218,23 +262,26 @@ class CrosswordCreator():
         The first value in the list, for example, should be the one
         that rules out the fewest values among the neighbors of `var`.
         """
-        # return list(self.domains[var])
-        ret = dict()  # dictionary with values in domains[var] as keys and number of neoghbor being ruled out as values
-        for val in self.domains[var]:
-            count_ruled_out = 0
-            check = True
-            for neighbor in self.crossword.neighbors(var):
-                overlap = self.crossword.overlaps[var, neighbor]
-                for neighbor_val in self.domains[neighbor]:
-                    # if consistent with a neighbor, skip (not rule out the neighbor)
-                    if val[overlap[0]] == neighbor_val[overlap[1]]:
-                        check = False
-                        break
-                if check == True:
-                    count_ruled_out += 1
-            ret[val] = count_ruled_out 
-        ret_sorted = sorted(ret, key=ret.get)  # sort ret using values
-        return ret_sorted
+        # for each unassigned neighbor, how many of its words have each
+        # letter where it crosses `var`
+        crossings = []
+        for neighbor in self.crossword.neighbors(var):
+            if neighbor in assignment:
+                continue
+            i, j = self.crossword.overlaps[var, neighbor]
+            domain = self.domains[neighbor]
+            counts = {
+                letter: popcount(words & domain)
+                for letter, words in self.crossword.positions[
+                    neighbor.length, j].items()
+            }
+            crossings.append((i, counts, popcount(domain)))
+
+        def ruled_out(word):
+            return sum(size - counts.get(word[i], 0)
+                       for i, counts, size in crossings)
+
+        return sorted(self.domain_words(var), key=ruled_out)
 
     def select_unassigned_variable(self, assignment):
         """
@@ -244,41 +291,11 @@ class CrosswordCreator():
         degree. If there is a tie, any of the tied variables are acceptable
         return values.
         """
-        # for var in self.crossword.variables:
-        #     if var not in assignment.keys():
-        #         return var
-        unassigned = []
-        # add unassigned value into unassigned list
-        for var in self.crossword.variables:
-            if var not in assignment.keys():
-                unassigned.append(var)
-        # take list of variables with minimum number of remaining values in its domain
-        minn = 999999
-        min_set = set()
-        for var in unassigned:
-            var_len = len(self.domains[var])
-            if var_len < minn:
-                minn = var_len
-                min_set.clear()
-                min_set.add(var)
-            elif var_len == minn:
-                min_set.add(var)
-        # if there's only one value in min_set, return that value
-        if len(min_set) == 1:
-            return min_set.pop()
-        # if there's more than one, return the value with the highest degree
-        else:
-            max_deg = 0
-            max_deg_set = set()
-            for var in min_set:
-                neighbor_len = len(self.crossword.neighbors(var))
-                if neighbor_len > max_deg:
-                    max_deg = neighbor_len
-                    max_deg_set.clear()
-                    max_deg_set.add(var)
-                elif neighbor_len == max_deg:
-                    max_deg_set.add(var)
-            return max_deg_set.pop()
+        unassigned = [
+            var for var in self.crossword.variables if var not in assignment
+        ]
+        return min(unassigned, key=lambda var: (
+            self.domain_size(var), -len(self.crossword.neighbors(var))))
 
     def backtrack(self, assignment):
         """
@@ -288,35 +305,51 @@ class CrosswordCreator():
         `assignment` is a mapping from variables (keys) to words (values).
 
         If no assignment is possible, return None.
+
+        Each value tried is assigned in place and its domain and arc
+        consistency changes go on the trail, so undoing a failed value
+        only restores what it changed.
         """
         # if assignment is complete, return assignment
         if self.assignment_complete(assignment):
             return assignment
-        # iterate through variables and values, applying arc consistency and check consistent
         var = self.select_unassigned_variable(assignment)
+        words = self.vocabulary[var.length]
         for val in self.order_domain_values(var, assignment):
-            buf_var_domain = copy.deepcopy(self.domains[var])
-            buf_assignment = copy.deepcopy(assignment)
+            mark = len(self.trail)
             assignment[var] = val
-            self.domains[var] = {val}
             if self.consistent(assignment):
-                arcs = [(var, var2) for var2 in self.crossword.neighbors(var)]
+                self.set_domain(var, 1 << bisect.bisect_left(words, val))
+                arcs = [(var2, var) for var2 in self.crossword.neighbors(var)
+                        if var2 not in assignment]
                 # inference
                 if self.ac3(arcs):
-                    for var in self.crossword.variables:
-                        if len(self.domains[var]) == 1:
-                            for v in self.domains[var]:
-                                assignment[var] = v
-                result = self.backtrack(assignment)
-                if result != None:
-                    return result
-            # remove assignment[var] = val and inferences made by ac3 from assignment
-            assignment = copy.deepcopy(buf_assignment)
-            var = self.select_unassigned_variable(assignment)  # change value of var back to upper concurrence
-            self.domains[var] = copy.deepcopy(buf_var_domain)
+                    result = self.backtrack(assignment)
+                    if result is not None:
+                        return result
+            # remove assignment[var] = val and the inferences made by ac3
+            del assignment[var]
+            self.undo(mark)
         return None
 
 
+def popcount(mask):
+    """
+    Return the number of set bits of `mask`.
+    """
+    return bin(mask).count("1")
+
+
+def bits(mask):
+    """
+    Yield the index of every set bit of `mask`, lowest first.
+    """
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
 def main():
 
     # Check usage
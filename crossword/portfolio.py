@@ -0,0 +1,120 @@
+import multiprocessing
+import os
+import queue
+import sys
+import time
+
+from crossword import Crossword
+from generate import CrosswordCreator
+from search import make_creator
+
+# Strategies the first workers run, each with its own seed; the rest
+# run "restarts" with further seeds
+LEADERS = ("restarts", "wdeg", "cbj")
+
+# Seconds between checks that some worker is still running
+POLL = 0.1
+
+
+def main():
+
+    # Check usage
+    if len(sys.argv) not in [3, 4]:
+        sys.exit("Usage: python portfolio.py structure words [output]")
+
+    # Parse command-line arguments
+    structure = sys.argv[1]
+    words = sys.argv[2]
+    output = sys.argv[3] if len(sys.argv) == 4 else None
+
+    # Generate crossword
+    crossword = Crossword(structure, words)
+    result = solve_portfolio(crossword)
+
+    # Print result
+    creator = CrosswordCreator(crossword)
+    if result.assignment is None:
+        print("No solution.")
+    else:
+        creator.print(result.assignment)
+        if output:
+            creator.save(result.assignment, output)
+    print(f"Settled by {result.strategy} (seed {result.seed}) "
+          f"in {result.seconds:.3f}s, first of {result.workers} workers")
+
+
+class PortfolioResult():
+    """
+    The outcome of the first solver in a portfolio to finish: its
+    assignment (None if it proved there is none), the strategy and
+    seed it ran with, and the wall time taken.
+    """
+
+    def __init__(self, assignment, strategy, seed, seconds, workers):
+        self.assignment = assignment
+        self.strategy = strategy
+        self.seed = seed
+        self.seconds = seconds
+        self.workers = workers
+
+
+def configurations(n):
+    """
+    Return `n` (strategy, seed) pairs: one for each of LEADERS, then
+    "restarts" with a different seed for each worker after that.
+    """
+    return [
+        (LEADERS[i] if i < len(LEADERS) else "restarts", i)
+        for i in range(n)
+    ]
+
+
+def solve_portfolio(crossword, processes=None, timeout=None):
+    """
+    Solve `crossword` with one differently configured solver per
+    process and return a PortfolioResult for whichever finishes first,
+    terminating the rest. Every strategy is complete, so the first to
+    finish settles the puzzle either way.
+
+    Return None if `timeout` seconds pass first. Raise RuntimeError if
+    every worker dies without an answer.
+    """
+    if processes is None:
+        processes = os.cpu_count() or 1
+    start = time.perf_counter()
+    results = multiprocessing.Queue()
+    workers = [
+        multiprocessing.Process(
+            target=_solve, args=(crossword, strategy, seed, results),
+            daemon=True)
+        for strategy, seed in configurations(processes)
+    ]
+    for worker in workers:
+        worker.start()
+    try:
+        while True:
+            try:
+                strategy, seed, assignment = results.get(timeout=POLL)
+                break
+            except queue.Empty:
+                pass
+            if timeout is not None and time.perf_counter() - start > timeout:
+                return None
+            if not any(worker.is_alive() for worker in workers) and results.empty():
+                raise RuntimeError("Every portfolio worker failed.")
+    finally:
+        for worker in workers:
+            worker.terminate()
+        for worker in workers:
+            worker.join()
+    return PortfolioResult(assignment, strategy, seed,
+                           time.perf_counter() - start, len(workers))
+
+
+def _solve(crossword, strategy, seed, results):
+    assignment = make_creator(crossword, strategy, seed).solve()
+    results.put((strategy, seed, assignment))
+
+
+if __name__ == "__main__":
+    main()
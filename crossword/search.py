@@ -0,0 +1,283 @@
+import bisect
+import random
+import sys
+
+from crossword import Crossword
+from generate import CrosswordCreator
+
+# Failures allowed before a restart, times the next term of the Luby sequence
+RESTART_BASE = 100
+
+# Options for SearchCreator by strategy name; "backtrack" is the
+# solver in generate.py
+STRATEGIES = {
+    "backtrack": None,
+    "fc": dict(propagation="fc"),
+    "mac": dict(propagation="mac"),
+    "cbj": dict(propagation="mac", backjump=True),
+    "wdeg": dict(propagation="mac", backjump=True, ordering="wdeg"),
+    "restarts": dict(propagation="mac", backjump=True, ordering="wdeg",
+                     restarts=True),
+}
+
+
+def main():
+
+    # Check usage
+    if len(sys.argv) not in [4, 5] or sys.argv[1] not in STRATEGIES:
+        sys.exit(f"Usage: python search.py [{'|'.join(STRATEGIES)}] "
+                 "structure words [output]")
+
+    # Parse command-line arguments
+    strategy = sys.argv[1]
+    structure = sys.argv[2]
+    words = sys.argv[3]
+    output = sys.argv[4] if len(sys.argv) == 5 else None
+
+    # Generate crossword
+    crossword = Crossword(structure, words)
+    creator = make_creator(crossword, strategy)
+    assignment = creator.solve()
+
+    # Print result
+    if assignment is None:
+        print("No solution.")
+    else:
+        creator.print(assignment)
+        if output:
+            creator.save(assignment, output)
+    if isinstance(creator, SearchCreator):
+        print(f"{creator.nodes} nodes, {creator.failures} failures, "
+              f"{creator.restarts_made} restarts")
+
+
+def make_creator(crossword, strategy, seed=None):
+    """
+    Return a creator that solves `crossword` with the named strategy.
+    """
+    options = STRATEGIES[strategy]
+    if options is None:
+        return CrosswordCreator(crossword)
+    return SearchCreator(crossword, seed=seed, **options)
+
+
+class Restart(Exception):
+    """Raised when search reaches its failure cutoff."""
+
+
+class SearchCreator(CrosswordCreator):
+
+    def __init__(self, crossword, propagation="mac", backjump=False,
+                 ordering="mrv", restarts=False, seed=None):
+        """
+        Create a crossword generator with a choice of search strategy.
+
+        `propagation` is "fc" to only revise the neighbors of each
+        assigned variable (forward checking), or "mac" to maintain arc
+        consistency from there. With `backjump`, a dead end jumps back
+        to the most recent variable in its conflict set rather than
+        the previous one. `ordering` is "mrv" for the minimum remaining
+        values heuristic or "wdeg" for dom/wdeg. With `restarts`, the
+        search starts over after a growing number of failures, keeping
+        its constraint weights and the nogoods it has learned.
+
+        Each domain change records which assigned variables caused it
+        in `self.reasons`, so that every failure comes with the set of
+        assignments to blame.
+        """
+        super().__init__(crossword)
+        self.propagation = propagation
+        self.backjump = backjump
+        self.ordering = ordering
+        self.restarts = restarts
+        self.random = random.Random(seed)
+        self.reasons = {var: frozenset() for var in crossword.variables}
+        self.assignment = dict()
+        self.used = dict()
+        self.weights = dict()
+        self.nogoods = dict()
+        self.cutoff = None
+        self.nodes = 0
+        self.failures = 0
+        self.restarts_made = 0
+
+    def set_domain(self, var, domain, reason=frozenset()):
+        """
+        Replace the domain of `var` with the bitset `domain`, blaming
+        the assigned variables in `reason` as well as any blamed for
+        its earlier changes.
+        """
+        if domain != self.domains[var]:
+            self.trail.append((var, self.domains[var], self.reasons[var]))
+            self.domains[var] = domain
+            self.reasons[var] = self.reasons[var] | reason
+
+    def undo(self, mark):
+        while len(self.trail) > mark:
+            var, domain, reason = self.trail.pop()
+            self.domains[var] = domain
+            self.reasons[var] = reason
+
+    def explain(self, var):
+        """
+        Return the assigned variables that account for the domain of
+        `var`: those blamed for pruning it, and `var` if it is assigned.
+        """
+        if var in self.assignment:
+            return self.reasons[var] | {var}
+        return self.reasons[var]
+
+    def revise(self, x, y):
+        domain = self.supported(x, y)
+        if domain == self.domains[x]:
+            return False
+        self.set_domain(x, domain, self.explain(y))
+        return True
+
+    def select_unassigned_variable(self, assignment):
+        """
+        Return an unassigned variable by minimum remaining values, or
+        with dom/wdeg ordering the one with the fewest remaining values
+        per unit of weight on its constraints to unassigned variables,
+        where a constraint's weight counts the domain wipeouts it has
+        caused. Ties are broken at random.
+        """
+        if self.ordering != "wdeg":
+            return super().select_unassigned_variable(assignment)
+
+        def score(var):
+            weight = sum(
+                self.weights.get((var, z), 1)
+                for z in self.crossword.neighbors(var) if z not in assignment
+            )
+            return (self.domain_size(var) / max(weight, 1), self.random.random())
+
+        unassigned = [
+            var for var in self.crossword.variables if var not in assignment
+        ]
+        return min(unassigned, key=score)
+
+    def solve(self):
+        """
+        Enforce node and arc consistency, and then search, restarting
+        with the Luby sequence of cutoffs if restarts are enabled.
+        """
+        self.enforce_node_consistency()
+        if not self.ac3():
+            return None
+        root = len(self.trail)
+        attempt = 0
+        while True:
+            attempt += 1
+            if self.restarts:
+                self.cutoff = self.failures + RESTART_BASE * luby(attempt)
+            try:
+                result = self.search()
+            except Restart:
+                self.restarts_made += 1
+                self.undo(root)
+                self.assignment.clear()
+                self.used.clear()
+                continue
+            return result if isinstance(result, dict) else None
+
+    def search(self):
+        """
+        Extend `self.assignment` to a complete assignment and return a
+        copy of it, or return the set of assigned variables to blame if
+        that is impossible.
+
+        Without backjumping every assigned variable is blamed, so the
+        search backs up one variable at a time.
+        """
+        if len(self.assignment) == len(self.crossword.variables):
+            return dict(self.assignment)
+        var = self.select_unassigned_variable(self.assignment)
+
+        # values pruned from the domain of var count against their causes
+        conflict = set(self.reasons[var])
+        for word in self.order_domain_values(var, self.assignment):
+            mark = len(self.trail)
+            failure = self.assign(var, word)
+            if failure is None:
+                result = self.search()
+                if isinstance(result, dict):
+                    return result
+                failure = result
+                self.undo(mark)
+                self.unassign(var)
+                if self.backjump and var not in failure:
+                    return failure
+            conflict |= failure
+            conflict.discard(var)
+            self.failures += 1
+            if self.cutoff is not None and self.failures >= self.cutoff:
+                raise Restart
+
+        if not self.backjump:
+            conflict = set(self.assignment)
+        if self.restarts:
+            self.learn(conflict)
+        return conflict
+
+    def assign(self, var, word):
+        """
+        Assign `word` to `var` and propagate. Return None if no domain
+        is emptied; otherwise undo the assignment and return the set of
+        assigned variables to blame.
+        """
+        self.nodes += 1
+        if word in self.used:
+            return {self.used[word]}
+        for nogood in self.nogoods.get((var, word), []):
+            if all(self.assignment.get(v) == w for v, w in nogood if v != var):
+                return {v for v, w in nogood if v != var}
+
+        mark = len(self.trail)
+        self.assignment[var] = word
+        self.used[word] = var
+        words = self.vocabulary[var.length]
+        self.set_domain(var, 1 << bisect.bisect_left(words, word))
+        arcs = [
+            (z, var) for z in self.crossword.neighbors(var)
+            if z not in self.assignment
+        ]
+        wiped = self.propagate(arcs, spread=self.propagation == "mac")
+        if wiped is None:
+            return None
+
+        x, y = wiped
+        self.weights[x, y] = self.weights[y, x] = self.weights.get((x, y), 1) + 1
+        failure = set(self.explain(x))
+        self.undo(mark)
+        self.unassign(var)
+        return failure
+
+    def unassign(self, var):
+        del self.used[self.assignment.pop(var)]
+
+    def learn(self, conflict):
+        """
+        Record the current assignments of the variables in `conflict`
+        as a nogood: no solution extends them, so after a restart they
+        are never tried together again.
+        """
+        nogood = frozenset((v, self.assignment[v]) for v in conflict)
+        for pair in nogood:
+            self.nogoods.setdefault(pair, []).append(nogood)
+
+
+def luby(i):
+    """
+    Return term `i`, counting from 1, of the Luby sequence
+    1, 1, 2, 1, 1, 2, 4, 1, 1, 2, 1, 1, 2, 4, 8, ...
+    """
+    while True:
+        k = i.bit_length()
+        if i == (1 << k) - 1:
+            return 1 << (k - 1)
+        i -= (1 << (k - 1)) - 1
+
+
+if __name__ == "__main__":
+    main()
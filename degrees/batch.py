@@ -0,0 +1,126 @@
+import csv
+import json
+import multiprocessing
+import os
+import sys
+
+import degrees
+
+# Number of worker processes, defaulting to one per CPU
+PROCESSES = os.cpu_count() or 1
+
+
+def main():
+    if len(sys.argv) not in (2, 3):
+        sys.exit("Usage: python batch.py directory [pairs.csv]")
+    directory = sys.argv[1]
+
+    # Load data before forking, so workers share it copy-on-write
+    degrees.load_data(directory)
+
+    if len(sys.argv) == 3:
+        with open(sys.argv[2], encoding="utf-8") as f:
+            pairs = read_pairs(f)
+    else:
+        pairs = read_pairs(sys.stdin)
+
+    for line in run_batch(directory, pairs):
+        print(line, flush=True)
+
+
+def read_pairs(f):
+    """
+    Return a list of (source, target) person_id pairs, one per row.
+    Blank rows and rows starting with `#` are skipped.
+    """
+    pairs = []
+    for row in csv.reader(f):
+        if not row or row[0].startswith("#"):
+            continue
+        if len(row) != 2:
+            raise ValueError(f"expected 'source,target', got {row}")
+        pairs.append((row[0].strip(), row[1].strip()))
+    return pairs
+
+
+def group_pairs(pairs):
+    """
+    Return a dictionary mapping each source person_id to the list of
+    target person_ids it is paired with, in first-seen order.
+    """
+    groups = {}
+    for source, target in pairs:
+        groups.setdefault(source, [])
+        if target not in groups[source]:
+            groups[source].append(target)
+    return groups
+
+
+def run_batch(directory, pairs, processes=PROCESSES):
+    """
+    Answer every (source, target) pair, yielding one JSON line per pair.
+
+    Pairs are grouped by source so that one breadth-first search tree
+    answers every target of that source, and groups run across a
+    process pool. Lines come out in the order groups finish.
+    """
+    groups = list(group_pairs(pairs).items())
+    if processes <= 1 or len(groups) <= 1:
+        for group in groups:
+            yield from solve_group(group)
+        return
+    with _pool(directory, processes) as pool:
+        for lines in pool.imap_unordered(solve_group, groups):
+            yield from lines
+
+
+def _pool(directory, processes):
+    """
+    Return a process pool whose workers can see the loaded graph.
+    """
+    if "fork" in multiprocessing.get_all_start_methods():
+        # Children inherit the parent's graph without reloading it
+        return multiprocessing.get_context("fork").Pool(processes)
+    return multiprocessing.Pool(
+        processes, initializer=degrees.load_data, initargs=(directory,))
+
+
+def solve_group(group):
+    """
+    Return the JSON lines answering every target of one source.
+    """
+    source, targets = group
+    graph = degrees.graph
+    source_index = graph.person_index(source)
+    target_indices = {
+        target: graph.person_index(target) for target in targets
+    }
+    paths = {}
+    if source_index is not None:
+        paths = degrees.paths_from(
+            source_index,
+            [i for i in target_indices.values() if i is not None])
+
+    lines = []
+    for target, target_index in target_indices.items():
+        result = {"source": source, "target": target}
+        if source_index is None or target_index is None:
+            missing = source if source_index is None else target
+            result["error"] = f"unknown person_id {missing}"
+        else:
+            path = paths[target_index]
+            if path is None:
+                result["degrees"] = None
+                result["path"] = None
+            else:
+                result["degrees"] = len(path)
+                result["path"] = [
+                    [graph.movie_ids[movie], graph.person_ids[person]]
+                    for movie, person in path
+                ]
+        lines.append(json.dumps(result))
+    return lines
+
+
+if __name__ == "__main__":
+    main()
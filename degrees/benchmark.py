@@ -0,0 +1,137 @@
+import csv
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from graph import SOURCES, build_graph
+
+# Loaders compared by the benchmark
+LOADERS = ("dictreader", "stream", "thread", "process")
+
+# Size of the synthetic dataset
+SYNTHETIC_PEOPLE = 200000
+SYNTHETIC_MOVIES = 50000
+STARS_PER_MOVIE = 8
+
+
+def main():
+    if len(sys.argv) == 4 and sys.argv[1] == "--run":
+        print(json.dumps(run_loader(sys.argv[2], sys.argv[3])))
+        return
+    if len(sys.argv) > 2:
+        sys.exit("Usage: python benchmark.py [directory]")
+
+    datasets = [sys.argv[1] if len(sys.argv) == 2 else "small"]
+    with tempfile.TemporaryDirectory() as synthetic:
+        print("Generating synthetic dataset...")
+        generate(synthetic, SYNTHETIC_PEOPLE, SYNTHETIC_MOVIES, STARS_PER_MOVIE)
+        datasets.append(synthetic)
+        for directory in datasets:
+            rows = count_rows(directory)
+            print(f"{directory} ({rows} rows)")
+            for loader in LOADERS:
+                result = measure(loader, directory)
+                print(f"  {loader:>10}: {result['seconds']:.3f}s, "
+                      f"{rows / result['seconds']:,.0f} rows/s, "
+                      f"peak RSS {result['max_rss'] / 1024:.1f} MiB")
+
+
+def legacy_load(directory):
+    """
+    Load data with csv.DictReader into dicts of sets, as
+    degrees.load_data did before the graph cache.
+    """
+    names, people, movies = {}, {}, {}
+    with open(f"{directory}/people.csv", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            people[row["id"]] = {
+                "name": row["name"],
+                "birth": row["birth"],
+                "movies": set()
+            }
+            names.setdefault(row["name"].lower(), set()).add(row["id"])
+    with open(f"{directory}/movies.csv", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            movies[row["id"]] = {
+                "title": row["title"],
+                "year": row["year"],
+                "stars": set()
+            }
+    with open(f"{directory}/stars.csv", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            try:
+                people[row["person_id"]]["movies"].add(row["movie_id"])
+                movies[row["movie_id"]]["stars"].add(row["person_id"])
+            except KeyError:
+                pass
+    return names, people, movies
+
+
+def run_loader(loader, directory):
+    """
+    Run one loader in this process and return its wall time and the
+    process's peak resident set size in KiB.
+    """
+    start = time.perf_counter()
+    if loader == "dictreader":
+        data = legacy_load(directory)
+    else:
+        data = build_graph(directory, None if loader == "stream" else loader)
+    seconds = time.perf_counter() - start
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    del data
+    return {"seconds": seconds, "max_rss": max_rss}
+
+
+def measure(loader, directory):
+    """
+    Run one loader in a fresh interpreter, so peak RSS is its own.
+    """
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--run", loader, directory],
+        check=True, capture_output=True, text=True).stdout
+    return json.loads(output)
+
+
+def count_rows(directory):
+    total = 0
+    for filename in SOURCES:
+        with open(os.path.join(directory, filename), encoding="utf-8") as f:
+            total += sum(1 for _ in f) - 1
+    return total
+
+
+def generate(directory, num_people, num_movies, stars_per_movie, seed=0):
+    """
+    Write a synthetic people/movies/stars dataset to `directory`,
+    including a few stars rows that refer to no known person.
+    """
+    rng = random.Random(seed)
+    with open(os.path.join(directory, "people.csv"), "w",
+              encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "name", "birth"])
+        for i in range(num_people):
+            writer.writerow([i, f"Person {i}", rng.randint(1900, 2010)])
+    with open(os.path.join(directory, "movies.csv"), "w",
+              encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "title", "year"])
+        for i in range(num_movies):
+            writer.writerow([i, f"Movie {i}", rng.randint(1920, 2020)])
+    with open(os.path.join(directory, "stars.csv"), "w",
+              encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["person_id", "movie_id"])
+        for movie in range(num_movies):
+            for _ in range(stars_per_movie):
+                writer.writerow([rng.randrange(num_people + 100), movie])
+
+
+if __name__ == "__main__":
+    main()
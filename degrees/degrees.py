@@ -1,55 +1,24 @@
-import csv
 import sys
 
-from util import Node, StackFrontier, QueueFrontier
+from graph import load_graph
+from landmarks import astar_search, load_index
+from util import Node, QueueFrontier
 
-# Maps names to a set of corresponding person_ids
-names = {}
+# Person-movie graph, with people and movies interned to dense ints
+graph = None
 
-# Maps person_ids to a dictionary of: name, birth, movies (a set of movie_ids)
-people = {}
-
-# Maps movie_ids to a dictionary of: title, year, stars (a set of person_ids)
-movies = {}
+# Optional landmark distance index, built by landmarks.py
+index = None
 
 
 def load_data(directory):
     """
-    Load data from CSV files into memory.
+    Load data from CSV files into memory, via the binary graph cache,
+    along with the landmark index if one has been built.
     """
-    # Load people
-    with open(f"{directory}/people.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            people[row["id"]] = {
-                "name": row["name"],
-                "birth": row["birth"],
-                "movies": set()
-            }
-            if row["name"].lower() not in names:
-                names[row["name"].lower()] = {row["id"]}
-            else:
-                names[row["name"].lower()].add(row["id"])
-
-    # Load movies
-    with open(f"{directory}/movies.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            movies[row["id"]] = {
-                "title": row["title"],
-                "year": row["year"],
-                "stars": set()
-            }
-
-    # Load stars
-    with open(f"{directory}/stars.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            try:
-                people[row["person_id"]]["movies"].add(row["movie_id"])
-                movies[row["movie_id"]]["stars"].add(row["person_id"])
-            except KeyError:
-                pass
+    global graph, index
+    graph = load_graph(directory)
+    index = load_index(directory)
 
 
 def main():
@@ -78,9 +47,9 @@ def main():
         print(f"{degrees} degrees of separation.")
         path = [(None, source)] + path
         for i in range(degrees):
-            person1 = people[path[i][1]]["name"]
-            person2 = people[path[i + 1][1]]["name"]
-            movie = movies[path[i + 1][0]]["title"]
+            person1 = graph.person_names[graph.person_index(path[i][1])]
+            person2 = graph.person_names[graph.person_index(path[i + 1][1])]
+            movie = graph.movie_titles[graph.movie_index(path[i + 1][0])]
             print(f"{i + 1}: {person1} and {person2} starred in {movie}")
 
 
@@ -91,31 +60,111 @@ def shortest_path(source, target):
 
     If no possible path, returns None.
     """
-    result = []  # return value (set of actions)
     if source == target:
-        return result
-    fr = QueueFrontier()  # frontier
-    sourceNode = Node(people[source], None, None)
-    fr.add(sourceNode)
-    while True:
-        if fr.empty():
-            raise Exception("no solution")
-        recentNode = fr.remove()
-        setID = names[recentNode.state["name"].lower()]
-        for id in setID:
-            if recentNode.state['birth'] == people[id]['birth']:
-                recentID = id
-        trackNode = fr.contains_state(people[target])
-        if trackNode != None:
-            while True:
-                result.append(trackNode.action)
-                trackNode = trackNode.parent
-                if trackNode.parent == None:
-                    break
-            result.reverse()
-            return result
-        for (movie, person) in neighbors_for_person(recentID):
-            fr.add(Node(people[person], recentNode, (movie, person)))
+        return []
+    source = graph.person_index(source)
+    target = graph.person_index(target)
+    if not graph.connected(source, target):
+        return None
+    if index is not None:
+        path = astar_search(graph, index, source, target)
+    else:
+        path = bidirectional_search(source, target)
+    if path is None:
+        return None
+    return [(graph.movie_ids[movie], graph.person_ids[person])
+            for movie, person in path]
+
+
+def bidirectional_search(source, target):
+    """
+    Returns the shortest list of (movie, person) index pairs that
+    connect person index `source` to `target`, or None.
+
+    Runs breadth-first search from both ends at once, always expanding
+    a whole layer of whichever frontier is smaller, and stops at the
+    layer where the two searches meet.
+    """
+    if source == target:
+        return []
+    # Maps each reached person to (movie, person) one step nearer its root,
+    # and the number of steps from that root
+    parents = ({source: None}, {target: None})
+    depths = ({source: 0}, {target: 0})
+    frontiers = ([source], [target])
+    while frontiers[0] and frontiers[1]:
+        side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+        parent, other = parents[side], parents[1 - side]
+        depth, other_depth = depths[side], depths[1 - side]
+        best = None
+        layer = []
+        for person in frontiers[side]:
+            for movie, neighbor in graph.neighbors(person):
+                if neighbor in parent:
+                    continue
+                parent[neighbor] = (movie, person)
+                depth[neighbor] = depth[person] + 1
+                layer.append(neighbor)
+                if neighbor in other:
+                    length = depth[neighbor] + other_depth[neighbor]
+                    if best is None or length < best[0]:
+                        best = (length, neighbor)
+        if best is not None:
+            return _join_paths(parents[0], parents[1], best[1])
+        frontiers = (layer, frontiers[1]) if side == 0 else (frontiers[0], layer)
+    return None
+
+
+def _join_paths(forward, backward, meet):
+    """
+    Returns the (movie, person) path through `meet` described by the
+    parent maps of a forward and a backward search.
+    """
+    path = []
+    person = meet
+    while forward[person] is not None:
+        movie, previous = forward[person]
+        path.append((movie, person))
+        person = previous
+    path.reverse()
+    person = meet
+    while backward[person] is not None:
+        movie, following = backward[person]
+        path.append((movie, following))
+        person = following
+    return path
+
+
+def paths_from(source, targets):
+    """
+    Returns a dictionary mapping each person index in `targets` to the
+    shortest list of (movie, person) index pairs that connect person
+    index `source` to it, or None if it is not connected.
+
+    Grows a single breadth-first search tree from `source`, stopping as
+    soon as every target has been reached.
+    """
+    found = {target: None for target in targets
+             if not graph.connected(source, target)}
+    remaining = set(targets) - set(found)
+    fr = QueueFrontier()
+    fr.add(Node(source, None, None))
+    while remaining and not fr.empty():
+        node = fr.remove()
+        if node.state in remaining:
+            remaining.remove(node.state)
+            path = []
+            step = node
+            while step.parent is not None:
+                path.append(step.action)
+                step = step.parent
+            path.reverse()
+            found[node.state] = path
+        for movie, person in graph.neighbors(node.state):
+            fr.add(Node(person, node, (movie, person)))
+    for target in remaining:
+        found[target] = None
+    return found
 
 
 def person_id_for_name(name):
@@ -123,15 +172,15 @@ def person_id_for_name(name):
     Returns the IMDB id for a person's name,
     resolving ambiguities as needed.
     """
-    person_ids = list(names.get(name.lower(), set()))
+    person_ids = [graph.person_ids[p] for p in graph.people_named(name)]
     if len(person_ids) == 0:
         return None
     elif len(person_ids) > 1:
         print(f"Which '{name}'?")
         for person_id in person_ids:
-            person = people[person_id]
-            name = person["name"]
-            birth = person["birth"]
+            p = graph.person_index(person_id)
+            name = graph.person_names[p]
+            birth = graph.person_births[p]
             print(f"ID: {person_id}, Name: {name}, Birth: {birth}")
         try:
             person_id = input("Intended Person ID: ")
@@ -149,11 +198,9 @@ def neighbors_for_person(person_id):
     Returns (movie_id, person_id) pairs for people
     who starred with a given person.
     """
-    movie_ids = people[person_id]["movies"]
     neighbors = set()
-    for movie_id in movie_ids:
-        for person_id in movies[movie_id]["stars"]:
-            neighbors.add((movie_id, person_id))
+    for movie, person in graph.neighbors(graph.person_index(person_id)):
+        neighbors.add((graph.movie_ids[movie], graph.person_ids[person]))
     return neighbors
 
 
@@ -0,0 +1,452 @@
+import concurrent.futures
+import csv
+import json
+import mmap
+import os
+import struct
+import unicodedata
+from array import array
+from bisect import bisect_left
+from operator import itemgetter
+
+# Bump whenever the layout of the cache file changes
+CACHE_VERSION = 4
+CACHE_MAGIC = b"DEGREES\0"
+CACHE_NAME = "degrees.cache"
+
+SOURCES = ("people.csv", "movies.csv", "stars.csv")
+
+# Columns read from each CSV
+COLUMNS = {
+    "people.csv": ("id", "name", "birth"),
+    "movies.csv": ("id", "title", "year"),
+    "stars.csv": ("person_id", "movie_id"),
+}
+
+
+class StringTable():
+    """
+    Read-only sequence of strings packed into one UTF-8 blob,
+    where string `i` is `blob[offsets[i]:offsets[i + 1]]`.
+    """
+
+    def __init__(self, blob, offsets):
+        self.blob = blob
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if not 0 <= i < len(self):
+            raise IndexError("string table index out of range")
+        return str(self.blob[self.offsets[i]:self.offsets[i + 1]], "utf-8")
+
+    @staticmethod
+    def pack(strings):
+        """
+        Return (blob, offsets) for a list of strings.
+        """
+        encoded = [s.encode("utf-8") for s in strings]
+        offsets = array("i", [0])
+        total = 0
+        for s in encoded:
+            total += len(s)
+            offsets.append(total)
+        return b"".join(encoded), offsets
+
+
+class Graph():
+    """
+    Person-movie bipartite graph with people and movies interned to
+    dense ints, in the order of their sorted IMDB ids.
+
+    Edges are stored in CSR form in both directions: the movies of
+    person `p` are `person_movies[person_offsets[p]:person_offsets[p + 1]]`
+    and the stars of movie `m` are
+    `movie_stars[movie_offsets[m]:movie_offsets[m + 1]]`.
+    """
+
+    def __init__(self, sections, source=None):
+        self.sections = sections
+        self.source = source
+        self.person_ids = StringTable(
+            sections["person_ids"], sections["person_ids_offsets"])
+        self.person_names = StringTable(
+            sections["person_names"], sections["person_names_offsets"])
+        self.person_births = StringTable(
+            sections["person_births"], sections["person_births_offsets"])
+        self.movie_ids = StringTable(
+            sections["movie_ids"], sections["movie_ids_offsets"])
+        self.movie_titles = StringTable(
+            sections["movie_titles"], sections["movie_titles_offsets"])
+        self.movie_years = StringTable(
+            sections["movie_years"], sections["movie_years_offsets"])
+        self.person_offsets = sections["person_offsets"]
+        self.person_movies = sections["person_movies"]
+        self.movie_offsets = sections["movie_offsets"]
+        self.movie_stars = sections["movie_stars"]
+        # Person indices sorted by normalized name, and those names
+        self.name_order = sections["name_order"]
+        self.search_names = StringTable(
+            sections["search_names"], sections["search_names_offsets"])
+        # Max segment tree over movie counts in name order
+        self.name_ranking = sections["name_ranking"]
+        # Connected component label of each person, and people per label
+        self.components = sections["components"]
+        self.component_sizes = sections["component_sizes"]
+
+    @property
+    def num_people(self):
+        return len(self.person_offsets) - 1
+
+    @property
+    def num_movies(self):
+        return len(self.movie_offsets) - 1
+
+    def person_index(self, person_id):
+        """
+        Return the dense index for an IMDB person id, or None.
+        """
+        return _find(self.person_ids, person_id)
+
+    def movie_index(self, movie_id):
+        """
+        Return the dense index for an IMDB movie id, or None.
+        """
+        return _find(self.movie_ids, movie_id)
+
+    def movies_of(self, p):
+        return self.person_movies[self.person_offsets[p]:self.person_offsets[p + 1]]
+
+    def stars_of(self, m):
+        return self.movie_stars[self.movie_offsets[m]:self.movie_offsets[m + 1]]
+
+    def neighbors(self, p):
+        """
+        Yield (movie, person) index pairs for everyone who starred
+        with person `p`, including `p` itself.
+        """
+        for m in self.movies_of(p):
+            for q in self.stars_of(m):
+                yield m, q
+
+    def connected(self, p, q):
+        """
+        Return True if there is any path between persons `p` and `q`.
+        """
+        return self.components[p] == self.components[q]
+
+    def people_named(self, name):
+        """
+        Return the indices of every person whose name matches `name`,
+        ignoring case, accents and extra whitespace.
+        """
+        key = normalize_name(name)
+        lo = bisect_left(self.search_names, key)
+        result = []
+        while lo < len(self.search_names) and self.search_names[lo] == key:
+            result.append(self.name_order[lo])
+            lo += 1
+        return result
+
+
+def normalize_name(name):
+    """
+    Return `name` lowercased, with accents stripped and runs of
+    whitespace collapsed to single spaces.
+    """
+    decomposed = unicodedata.normalize("NFKD", name.casefold())
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return " ".join(stripped.split())
+
+
+def _find(table, key):
+    i = bisect_left(table, key)
+    if i < len(table) and table[i] == key:
+        return i
+    return None
+
+
+def load_graph(directory, cache=True, executor=None):
+    """
+    Return the Graph for the CSV files in `directory`.
+
+    If `cache` is true, the graph is memory-mapped from a binary cache
+    file next to the CSVs, which is rebuilt whenever any of the CSVs
+    changes size or modification time. `executor` is passed on to
+    `ingest` when the CSVs have to be read.
+    """
+    if not cache:
+        return build_graph(directory, executor)
+    path = os.path.join(directory, CACHE_NAME)
+    key = source_key(directory)
+    graph = open_cache(path, key)
+    if graph is None:
+        graph = build_graph(directory, executor)
+        try:
+            write_cache(path, key, graph.sections)
+        except OSError:
+            return graph
+        graph = open_cache(path, key)
+    return graph
+
+
+def source_key(directory):
+    """
+    Return the size and mtime of each CSV, which the cache is keyed on.
+    """
+    key = {}
+    for filename in SOURCES:
+        st = os.stat(os.path.join(directory, filename))
+        key[filename] = [st.st_size, st.st_mtime_ns]
+    return key
+
+
+def read_columns(path, columns):
+    """
+    Stream the CSV file at `path`, returning a list of tuples holding
+    only the named `columns` of each row, in that order.
+    """
+    with open(path, encoding="utf-8", newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        try:
+            project = itemgetter(*(header.index(c) for c in columns))
+        except ValueError:
+            raise ValueError(f"{path} is missing one of the columns {columns}")
+        if len(columns) == 1:
+            return [(project(row),) for row in reader if row]
+        return [project(row) for row in reader if row]
+
+
+def ingest(directory, executor=None):
+    """
+    Return a dictionary mapping each CSV filename to its projected rows.
+
+    With `executor` set to "thread" or "process", the three files are
+    read concurrently on a pool of that kind and merged afterwards.
+    """
+    paths = {filename: os.path.join(directory, filename) for filename in SOURCES}
+    if executor is None:
+        return {filename: read_columns(path, COLUMNS[filename])
+                for filename, path in paths.items()}
+    pools = {
+        "thread": concurrent.futures.ThreadPoolExecutor,
+        "process": concurrent.futures.ProcessPoolExecutor,
+    }
+    with pools[executor](max_workers=len(SOURCES)) as pool:
+        futures = {filename: pool.submit(read_columns, path, COLUMNS[filename])
+                   for filename, path in paths.items()}
+        return {filename: future.result() for filename, future in futures.items()}
+
+
+def build_graph(directory, executor=None):
+    """
+    Build a Graph by reading the CSV files in `directory`.
+    """
+    rows = ingest(directory, executor)
+    people = rows["people.csv"]
+    movies = rows["movies.csv"]
+    stars = rows.pop("stars.csv")
+    people.sort()
+    movies.sort()
+    num_people, num_movies = len(people), len(movies)
+
+    # Resolve stars to dense indices, dropping rows that refer to
+    # unknown people or movies, and encode each edge as one int
+    person_index = {row[0]: i for i, row in enumerate(people)}
+    movie_index = {row[0]: i for i, row in enumerate(movies)}
+    codes = set()
+    for person_id, movie_id in stars:
+        p = person_index.get(person_id)
+        m = movie_index.get(movie_id)
+        if p is not None and m is not None:
+            codes.add(p * num_movies + m)
+    del stars, person_index, movie_index
+    edges = [divmod(code, num_movies) for code in sorted(codes)]
+    del codes
+
+    sections = {}
+    for name, column in (("person_ids", 0), ("person_names", 1),
+                         ("person_births", 2)):
+        sections[name], sections[name + "_offsets"] = StringTable.pack(
+            [row[column] for row in people])
+    for name, column in (("movie_ids", 0), ("movie_titles", 1),
+                         ("movie_years", 2)):
+        sections[name], sections[name + "_offsets"] = StringTable.pack(
+            [row[column] for row in movies])
+
+    sections["person_offsets"], sections["person_movies"] = _csr(
+        num_people, edges)
+    sections["movie_offsets"], sections["movie_stars"] = _csr(
+        num_movies, sorted((m, p) for p, m in edges))
+
+    sections["components"], sections["component_sizes"] = _components(
+        num_people, num_movies, edges)
+
+    normalized = [normalize_name(row[1]) for row in people]
+    sections["name_order"] = array(
+        "i", sorted(range(num_people), key=lambda p: (normalized[p], p)))
+    sections["search_names"], sections["search_names_offsets"] = (
+        StringTable.pack([normalized[p] for p in sections["name_order"]]))
+    sections["name_ranking"] = _ranking_tree(
+        sections["name_order"], sections["person_offsets"])
+    return Graph(sections, source=directory)
+
+
+def _csr(n, pairs):
+    """
+    Return (offsets, indices) for sorted (row, column) pairs over `n` rows.
+    """
+    offsets = array("i", bytes(4 * (n + 1)))
+    indices = array("i", bytes(4 * len(pairs)))
+    for k, (row, column) in enumerate(pairs):
+        offsets[row + 1] += 1
+        indices[k] = column
+    for row in range(n):
+        offsets[row + 1] += offsets[row]
+    return offsets, indices
+
+
+def _components(num_people, num_movies, edges):
+    """
+    Return (labels, sizes) for the connected components of the
+    person-movie graph, found by union-find with people as nodes
+    `0..num_people - 1` and movies as the nodes after them.
+
+    Labels are dense and numbered in order of each component's lowest
+    person index; sizes count people only.
+    """
+    parent = array("i", range(num_people + num_movies))
+    size = array("i", [1]) * (num_people + num_movies)
+
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for p, m in edges:
+        a, b = find(p), find(num_people + m)
+        if a == b:
+            continue
+        if size[a] < size[b]:
+            a, b = b, a
+        parent[b] = a
+        size[a] += size[b]
+
+    labels = array("i", bytes(4 * num_people))
+    sizes = array("i")
+    label_of_root = {}
+    for p in range(num_people):
+        root = find(p)
+        if root not in label_of_root:
+            label_of_root[root] = len(sizes)
+            sizes.append(0)
+        labels[p] = label_of_root[root]
+        sizes[labels[p]] += 1
+    return labels, sizes
+
+
+def _ranking_tree(name_order, person_offsets):
+    """
+    Return a max segment tree over the movie counts of the people in
+    `name_order`. Node 1 is the root and node `k` has children `2k`
+    and `2k + 1`; with `size` the smallest power of two that is at
+    least the number of people, leaf `size + i` is position `i`.
+
+    Each node holds the position below it of the person with the most
+    movies, the first on ties, or -1 if there is none.
+    """
+    n = len(name_order)
+    size = 1
+    while size < n:
+        size *= 2
+    counts = [person_offsets[p + 1] - person_offsets[p] for p in name_order]
+    tree = array("i", [-1]) * (2 * size)
+    tree[size:size + n] = array("i", range(n))
+    for node in range(size - 1, 0, -1):
+        left, right = tree[2 * node], tree[2 * node + 1]
+        if right == -1 or (left != -1 and counts[left] >= counts[right]):
+            tree[node] = left
+        else:
+            tree[node] = right
+    return tree
+
+
+def write_cache(path, key, sections):
+    """
+    Write named arrays and byte strings to a cache file at `path`,
+    tagged with `key` so stale files can be detected.
+
+    The file is a magic string, the length of a JSON header, the header
+    itself and then each section, aligned to 8 bytes.
+    """
+    layout = {}
+    offset = 0
+    for name, data in sections.items():
+        typecode = data.typecode if isinstance(data, array) else "B"
+        size = len(data) * (data.itemsize if isinstance(data, array) else 1)
+        layout[name] = [offset, size, typecode]
+        offset += size + (-size) % 8
+    header = json.dumps({
+        "version": CACHE_VERSION,
+        "sources": key,
+        "sections": layout,
+    }).encode("utf-8")
+    header += b" " * ((-len(header) - len(CACHE_MAGIC) - 4) % 8)
+
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(CACHE_MAGIC)
+        f.write(struct.pack("<I", len(header)))
+        f.write(header)
+        for name, data in sections.items():
+            size = layout[name][1]
+            f.write(data)
+            f.write(bytes((-size) % 8))
+    os.replace(tmp, path)
+
+
+def open_cache(path, key):
+    """
+    Memory-map the cache file at `path`, returning a Graph, or None
+    if the file is missing, corrupt or was built from different CSVs.
+    """
+    sections = read_cache(path, key)
+    if sections is None:
+        return None
+    return Graph(sections, source=path)
+
+
+def read_cache(path, key):
+    """
+    Memory-map the cache file at `path`, returning its sections as
+    memoryviews, or None if the file is missing, corrupt or was
+    written with a different `key`.
+    """
+    try:
+        with open(path, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    try:
+        if mm[:len(CACHE_MAGIC)] != CACHE_MAGIC:
+            return None
+        start = len(CACHE_MAGIC) + 4
+        (length,) = struct.unpack("<I", mm[len(CACHE_MAGIC):start])
+        header = json.loads(mm[start:start + length])
+        if header["version"] != CACHE_VERSION or header["sources"] != key:
+            return None
+        base = start + length
+        view = memoryview(mm)
+        sections = {}
+        for name, (offset, size, typecode) in header["sections"].items():
+            if offset < 0 or size < 0 or base + offset + size > len(mm):
+                return None
+            section = view[base + offset:base + offset + size]
+            sections[name] = section if typecode == "B" else section.cast(typecode)
+        return sections
+    except (ValueError, KeyError, TypeError, struct.error):
+        return None
@@ -0,0 +1,180 @@
+import heapq
+import os
+import sys
+from array import array
+
+from graph import load_graph, read_cache, source_key, write_cache
+
+INDEX_NAME = "landmarks.cache"
+
+# Number of landmarks picked when none are given
+LANDMARKS = 16
+
+# Distance recorded for people a landmark cannot reach
+UNREACHABLE = -1
+
+
+def main():
+    if len(sys.argv) not in (2, 3):
+        sys.exit("Usage: python landmarks.py directory [count]")
+    directory = sys.argv[1]
+    count = int(sys.argv[2]) if len(sys.argv) == 3 else LANDMARKS
+
+    print("Loading data...")
+    graph = load_graph(directory)
+    print("Building landmark index...")
+    index = build_index(graph, pick_landmarks(graph, count))
+    save_index(directory, index)
+    for landmark in index.landmarks:
+        print(f"  {graph.person_ids[landmark]}: {graph.person_names[landmark]}")
+    print(f"Saved {len(index.landmarks)} landmarks to {INDEX_NAME}.")
+
+
+class LandmarkIndex():
+    """
+    Breadth-first distances from a few landmark people to everyone,
+    stored person-major: the distance from landmark `i` to person `p`
+    is `distances[p * len(landmarks) + i]`, or UNREACHABLE.
+    """
+
+    def __init__(self, landmarks, distances):
+        self.landmarks = landmarks
+        self.distances = distances
+
+    def distances_to(self, p):
+        k = len(self.landmarks)
+        return self.distances[p * k:(p + 1) * k]
+
+    def disconnected(self, source, target):
+        """
+        Return True if some landmark reaches exactly one of `source`
+        and `target`, which means they are in different components.
+        """
+        for ds, dt in zip(self.distances_to(source), self.distances_to(target)):
+            if (ds == UNREACHABLE) != (dt == UNREACHABLE):
+                return True
+        return False
+
+    def lower_bound(self, p, target_distances):
+        """
+        Return a lower bound on the degrees between person `p` and the
+        target whose landmark distances are `target_distances`, using
+        the triangle inequality over every landmark that reaches both.
+        """
+        bound = 0
+        for dp, dt in zip(self.distances_to(p), target_distances):
+            if dp != UNREACHABLE and dt != UNREACHABLE:
+                d = dp - dt if dp > dt else dt - dp
+                if d > bound:
+                    bound = d
+        return bound
+
+
+def pick_landmarks(graph, count):
+    """
+    Return the `count` people who starred in the most movies.
+    """
+    offsets = graph.person_offsets
+    return heapq.nlargest(
+        count, range(graph.num_people),
+        key=lambda p: offsets[p + 1] - offsets[p])
+
+
+def distances_from(graph, source):
+    """
+    Return an array of breadth-first distances from person `source`
+    to every person, with UNREACHABLE for people it cannot reach.
+    """
+    distances = array("i", [UNREACHABLE]) * graph.num_people
+    distances[source] = 0
+    layer = [source]
+    depth = 0
+    while layer:
+        depth += 1
+        next_layer = []
+        for person in layer:
+            for _, neighbor in graph.neighbors(person):
+                if distances[neighbor] == UNREACHABLE:
+                    distances[neighbor] = depth
+                    next_layer.append(neighbor)
+        layer = next_layer
+    return distances
+
+
+def build_index(graph, landmarks):
+    """
+    Return a LandmarkIndex over the given landmark person indices.
+    """
+    landmarks = array("i", landmarks)
+    k = len(landmarks)
+    distances = array("i", [UNREACHABLE]) * (graph.num_people * k)
+    for i, landmark in enumerate(landmarks):
+        distances[i::k] = distances_from(graph, landmark)
+    return LandmarkIndex(landmarks, distances)
+
+
+def save_index(directory, index):
+    write_cache(os.path.join(directory, INDEX_NAME), source_key(directory), {
+        "landmarks": index.landmarks,
+        "distances": index.distances,
+    })
+
+
+def load_index(directory):
+    """
+    Return the saved LandmarkIndex for `directory`, or None if there
+    is none or the CSVs have changed since it was built.
+    """
+    sections = read_cache(
+        os.path.join(directory, INDEX_NAME), source_key(directory))
+    if sections is None:
+        return None
+    return LandmarkIndex(sections["landmarks"], sections["distances"])
+
+
+def astar_search(graph, index, source, target):
+    """
+    Returns the shortest list of (movie, person) index pairs that
+    connect person index `source` to `target`, or None.
+
+    Runs A* search with the landmark lower bounds as an admissible
+    heuristic, after first ruling out people the landmarks show are
+    disconnected.
+    """
+    if source == target:
+        return []
+    if index.disconnected(source, target):
+        return None
+    target_distances = index.distances_to(target)
+    parents = {source: None}
+    costs = {source: 0}
+    counter = 0
+    heap = [(index.lower_bound(source, target_distances), counter, source)]
+    closed = set()
+    while heap:
+        _, _, person = heapq.heappop(heap)
+        if person in closed:
+            continue
+        closed.add(person)
+        if person == target:
+            path = []
+            while parents[person] is not None:
+                movie, previous = parents[person]
+                path.append((movie, person))
+                person = previous
+            path.reverse()
+            return path
+        cost = costs[person] + 1
+        for movie, neighbor in graph.neighbors(person):
+            if neighbor not in costs or cost < costs[neighbor]:
+                costs[neighbor] = cost
+                parents[neighbor] = (movie, person)
+                counter += 1
+                heapq.heappush(heap, (
+                    cost + index.lower_bound(neighbor, target_distances),
+                    counter, neighbor))
+    return None
+
+
+if __name__ == "__main__":
+    main()
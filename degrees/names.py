@@ -0,0 +1,167 @@
+import heapq
+import itertools
+import sys
+from bisect import bisect_left
+
+from graph import load_graph, normalize_name
+
+# Sorts after every character that can appear in a name
+MAX_CHAR = "\U0010ffff"
+
+# Default number of suggestions returned
+LIMIT = 10
+
+# Default maximum edit distance for fuzzy matches
+DISTANCE = 2
+
+
+def main():
+    if len(sys.argv) != 3:
+        sys.exit("Usage: python names.py directory query")
+    directory, query = sys.argv[1], sys.argv[2]
+    graph = load_graph(directory)
+    index = NameIndex(graph)
+
+    print("Prefix matches:")
+    for p in index.prefix(query):
+        print(f"  {graph.person_ids[p]}: {graph.person_names[p]}")
+    print("Fuzzy matches:")
+    for p, distance in index.fuzzy(query):
+        print(f"  {graph.person_ids[p]}: {graph.person_names[p]} ({distance})")
+
+
+class NameIndex():
+    """
+    Prefix and fuzzy name search over the sorted array of normalized
+    names stored in a Graph, which doubles as an implicit trie: every
+    prefix is a contiguous range found by bisection.
+
+    Results are ranked by how many movies each person starred in.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+        self.names = graph.search_names
+        self.order = graph.name_order
+
+    def movie_count(self, p):
+        offsets = self.graph.person_offsets
+        return offsets[p + 1] - offsets[p]
+
+    def prefix_range(self, prefix, lo=0, hi=None):
+        """
+        Return the (lo, hi) range of sorted names starting with `prefix`.
+        """
+        if hi is None:
+            hi = len(self.names)
+        lo = bisect_left(self.names, prefix, lo, hi)
+        hi = bisect_left(self.names, prefix + MAX_CHAR, lo, hi)
+        return lo, hi
+
+    def ranked(self, lo, hi):
+        """
+        Yield the positions in [lo, hi) of the sorted names, most movies
+        first and then in name order.
+
+        Splits the range into nodes of the graph's `name_ranking` tree
+        and keeps them in a heap by their best person, so each result
+        only costs a walk down from one node to a leaf.
+        """
+        tree = self.graph.name_ranking
+        size = len(tree) // 2
+        heap = []
+
+        def push(node):
+            i = tree[node]
+            if i != -1:
+                heapq.heappush(
+                    heap, (-self.movie_count(self.order[i]), i, node))
+
+        lo, hi = lo + size, hi + size
+        while lo < hi:
+            if lo & 1:
+                push(lo)
+                lo += 1
+            if hi & 1:
+                hi -= 1
+                push(hi)
+            lo, hi = lo // 2, hi // 2
+        while heap:
+            _, i, node = heapq.heappop(heap)
+            if node >= size:
+                yield i
+            else:
+                push(2 * node)
+                push(2 * node + 1)
+
+    def prefix(self, prefix, limit=LIMIT):
+        """
+        Return up to `limit` person indices whose normalized name starts
+        with `prefix`, most movies first.
+        """
+        lo, hi = self.prefix_range(normalize_name(prefix))
+        ranked = itertools.islice(self.ranked(lo, hi), limit)
+        return [self.order[i] for i in ranked]
+
+    def fuzzy(self, name, distance=DISTANCE, limit=LIMIT):
+        """
+        Return up to `limit` (person index, edit distance) pairs for
+        people whose normalized name is within `distance` edits of
+        `name`, closest first and then most movies first.
+
+        Searches within 0 edits, then 1 and so on, stopping once
+        `limit` matches are found, since no farther name can outrank
+        them.
+        """
+        query = normalize_name(name)
+        matches = []
+        for bound in range(distance + 1):
+            matches = self._within(query, bound)
+            if len(matches) >= limit:
+                break
+        return heapq.nsmallest(
+            limit, matches, key=lambda m: (m[1], -self.movie_count(m[0])))
+
+    def _within(self, query, distance):
+        """
+        Return (person index, edit distance) pairs, in name order, for
+        every normalized name within `distance` edits of `query`.
+
+        Walks the implicit trie computing one Levenshtein row per
+        prefix, and skips every range whose row is already over
+        `distance`. A cell more than `distance` off the diagonal can
+        never be within reach, so only the band around it is computed
+        and the rest of each row is held at `distance + 1`.
+        """
+        matches = []
+        cap = distance + 1
+
+        def walk(lo, hi, depth, row):
+            # Every name in [lo, hi) shares the prefix `row` describes
+            i = lo
+            while i < hi and len(self.names[i]) == depth:
+                if row[-1] <= distance:
+                    matches.append((self.order[i], row[-1]))
+                i += 1
+            while i < hi:
+                group = self.names[i][:depth + 1]
+                end = bisect_left(self.names, group + MAX_CHAR, i, hi)
+                c = group[-1]
+                next_row = [min(row[0] + 1, cap)] + [cap] * len(query)
+                for j in range(max(1, depth + 1 - distance),
+                               min(len(row), depth + 2 + distance)):
+                    next_row[j] = min(
+                        next_row[j - 1] + 1,
+                        row[j] + 1,
+                        row[j - 1] + (query[j - 1] != c),
+                        cap)
+                if min(next_row) <= distance:
+                    walk(i, end, depth + 1, next_row)
+                i = end
+
+        walk(0, len(self.names), 0, list(range(len(query) + 1)))
+        return matches
+
+
+if __name__ == "__main__":
+    main()
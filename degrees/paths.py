@@ -0,0 +1,328 @@
+import heapq
+import itertools
+import math
+import sys
+
+from graph import load_graph
+
+# Default number of paths printed by main
+K = 5
+
+
+def main():
+    if len(sys.argv) not in (4, 5):
+        sys.exit("Usage: python paths.py directory source_id target_id [k]")
+    directory, source_id, target_id = sys.argv[1:4]
+    k = int(sys.argv[4]) if len(sys.argv) == 5 else K
+
+    graph = load_graph(directory)
+    source = graph.person_index(source_id)
+    target = graph.person_index(target_id)
+    if source is None or target is None:
+        sys.exit("Person not found.")
+
+    if not graph.connected(source, target):
+        sys.exit("Not connected.")
+
+    dag = ShortestPathDAG(graph, source, target)
+    print(f"{dag.count()} shortest paths of {dag.length} degrees.")
+    print(f"{k} shortest paths, the shortest ranked by most recent movie:")
+    paths = k_shortest_paths(graph, source, target, key=by_recency(graph))
+    for path in itertools.islice(paths, k):
+        steps = [graph.person_names[source]]
+        for movie, person in path:
+            steps.append(f"({graph.movie_titles[movie]}) {graph.person_names[person]}")
+        print("  " + " - ".join(steps))
+
+
+class ShortestPathDAG():
+    """
+    Every shortest path between two people, as the layered DAG of
+    (movie, person) steps that lie on at least one of them.
+
+    Built from a breadth-first search out of each end, bounded by the
+    distance between them: a person is on a shortest path exactly when
+    their distances from both ends add up to that distance.
+    """
+
+    def __init__(self, graph, source, target):
+        self.graph = graph
+        self.source = source
+        self.target = target
+        self.length = None
+        self.forward = None
+        if graph.connected(source, target):
+            self.forward = _layers(graph, source, target)
+        if self.forward is None:
+            self.backward = {}
+            self._counts = {}
+            return
+        self.length = self.forward[target]
+        self.backward = _layers(graph, target, None, self.length)
+        self._counts = None
+
+    def on_path(self, person):
+        return (person in self.forward and person in self.backward
+                and self.forward[person] + self.backward[person] == self.length)
+
+    def successors(self, person):
+        """
+        Yield the (movie, person) steps one layer nearer the target.
+        """
+        depth = self.forward[person] + 1
+        for movie, neighbor in self.graph.neighbors(person):
+            if self.forward.get(neighbor) == depth and self.on_path(neighbor):
+                yield movie, neighbor
+
+    def layers(self):
+        """
+        Return the people on a shortest path grouped by their distance
+        from the source.
+        """
+        layers = [[] for _ in range(self.length + 1)]
+        for person, depth in self.forward.items():
+            if self.on_path(person):
+                layers[depth].append(person)
+        return layers
+
+    def counts(self):
+        """
+        Return a dictionary mapping each person on a shortest path to
+        the number of shortest paths from them to the target.
+        """
+        if self._counts is None:
+            counts = {self.target: 1}
+            for layer in reversed(self.layers()[:-1]):
+                for person in layer:
+                    counts[person] = sum(
+                        counts[neighbor] for _, neighbor in self.successors(person))
+            self._counts = counts
+        return self._counts
+
+    def count(self):
+        """
+        Return the number of shortest paths, without enumerating them.
+        """
+        if self.length is None:
+            return 0
+        return self.counts()[self.source]
+
+    def paths(self):
+        """
+        Yield every shortest path as a list of (movie, person) pairs,
+        one at a time, by depth-first search over the DAG.
+        """
+        if self.length is None:
+            return
+        if self.length == 0:
+            yield []
+            return
+        path = []
+        stack = [self.successors(self.source)]
+        while stack:
+            step = next(stack[-1], None)
+            if step is None:
+                stack.pop()
+                if path:
+                    path.pop()
+                continue
+            path.append(step)
+            if step[1] == self.target:
+                yield list(path)
+                path.pop()
+            else:
+                stack.append(self.successors(step[1]))
+
+    def ranked_paths(self, key):
+        """
+        Yield every shortest path, lowest rank first, where
+        `key(movie, person)` scores each step and a path ranks by its
+        lowest-scoring step. Ties come in no particular order.
+
+        Best-first search over the DAG: each partial path is ranked by
+        the best score any way on from it can reach, worked out once
+        per person, so every path is found as soon as it is next.
+        """
+        if self.length is None:
+            return
+        if self.length == 0:
+            yield []
+            return
+        best = {self.target: math.inf}
+        for layer in reversed(self.layers()[:-1]):
+            for person in layer:
+                best[person] = min(
+                    min(key(movie, neighbor), best[neighbor])
+                    for movie, neighbor in self.successors(person))
+        counter = itertools.count()
+        frontier = [
+            (best[self.source], next(counter), math.inf, self.source, [])]
+        while frontier:
+            _, _, score, person, path = heapq.heappop(frontier)
+            if person == self.target:
+                yield path
+                continue
+            for movie, neighbor in self.successors(person):
+                step = min(score, key(movie, neighbor))
+                heapq.heappush(frontier, (
+                    min(step, best[neighbor]), next(counter), step, neighbor,
+                    path + [(movie, neighbor)]))
+
+
+def _layers(graph, source, target, limit=None):
+    """
+    Return a dictionary of breadth-first distances from `source`.
+
+    Stops after the layer that reaches `target`, returning None if it
+    is never reached, or after depth `limit` when there is no target.
+    """
+    depths = {source: 0}
+    layer = [source]
+    depth = 0
+    while layer:
+        if target is not None and target in depths:
+            return depths
+        if limit is not None and depth == limit:
+            return depths
+        depth += 1
+        next_layer = []
+        for person in layer:
+            for movie, neighbor in graph.neighbors(person):
+                if neighbor in depths:
+                    continue
+                depths[neighbor] = depth
+                next_layer.append(neighbor)
+        layer = next_layer
+    return None if target is not None else depths
+
+
+def all_shortest_paths(graph, source, target):
+    """
+    Yield every shortest list of (movie, person) pairs that connects
+    person `source` to `target`.
+    """
+    yield from ShortestPathDAG(graph, source, target).paths()
+
+
+def _bfs_path(graph, source, target, banned_people, banned_steps,
+              through=None):
+    """
+    Return a shortest (movie, person) path avoiding the banned people
+    and (person, movie, person) steps, or None.
+
+    No two steps in a row go through the same movie, since that is
+    only a detour within one cast; the first step may not go through
+    `through` either, as if `source` had been reached through it.
+    """
+    if source == target:
+        return []
+    # Up to two (movie, person) steps reaching each person at its depth,
+    # through different movies, so that a way on through any movie is kept
+    arrivals = {source: [(through, None)]}
+    layer = [source]
+    while layer:
+        next_layer = []
+        reached = set()
+        for person in layer:
+            ways = arrivals[person]
+            for movie, neighbor in graph.neighbors(person):
+                if len(ways) == 1 and ways[0][0] == movie:
+                    continue
+                if neighbor in banned_people:
+                    continue
+                if (person, movie, neighbor) in banned_steps:
+                    continue
+                if neighbor not in arrivals:
+                    arrivals[neighbor] = [(movie, person)]
+                    next_layer.append(neighbor)
+                    reached.add(neighbor)
+                elif (neighbor in reached and len(arrivals[neighbor]) == 1
+                        and arrivals[neighbor][0][0] != movie):
+                    arrivals[neighbor].append((movie, person))
+                if neighbor == target:
+                    path = []
+                    step = None
+                    while neighbor != source:
+                        step = next(way for way in arrivals[neighbor]
+                                    if step is None or way[0] != step[0])
+                        path.append((step[0], neighbor))
+                        neighbor = step[1]
+                    path.reverse()
+                    return path
+        layer = next_layer
+    return None
+
+
+def k_shortest_paths(graph, source, target, key=None):
+    """
+    Yield loopless (movie, person) paths from person `source` to
+    `target` in order of length, using Yen's algorithm, never taking
+    two steps in a row through the same movie. Take the first k with
+    `itertools.islice`.
+
+    If `key` is given, the shortest paths are ranked by it as in
+    `ShortestPathDAG.ranked_paths`, and longer ones follow in the order
+    Yen's algorithm finds them.
+    """
+    if key is None:
+        yield from _yen(graph, source, target)
+        return
+    dag = ShortestPathDAG(graph, source, target)
+    yield from dag.ranked_paths(key)
+    for path in _yen(graph, source, target):
+        if len(path) > dag.length:
+            yield path
+
+
+def _yen(graph, source, target):
+    """
+    Yield loopless paths from `source` to `target` by Yen's algorithm,
+    shortest first, with no order among paths of equal length.
+    """
+    first = _bfs_path(graph, source, target, set(), set())
+    if first is None:
+        return
+    found = [first]
+    seen = {tuple(first)}
+    candidates = []
+    counter = itertools.count()
+    yield first
+    while True:
+        previous = found[-1]
+        people = [source] + [person for _, person in previous]
+        for i in range(len(previous)):
+            spur = people[i]
+            root = previous[:i]
+            banned_steps = {
+                (spur,) + tuple(path[i])
+                for path in found
+                if len(path) > i and path[:i] == root
+            }
+            spur_path = _bfs_path(
+                graph, spur, target, set(people[:i]), banned_steps,
+                root[-1][0] if root else None)
+            if spur_path is None:
+                continue
+            path = root + spur_path
+            if tuple(path) not in seen:
+                seen.add(tuple(path))
+                heapq.heappush(candidates, (len(path), next(counter), path))
+        if not candidates:
+            return
+        path = heapq.heappop(candidates)[-1]
+        found.append(path)
+        yield path
+
+
+def by_recency(graph):
+    """
+    Return a step key that ranks paths through more recent movies
+    first, comparing the newest movie year on each path.
+    """
+    def key(movie, person):
+        return -int(graph.movie_years[movie] or 0)
+    return key
+
+
+if __name__ == "__main__":
+    main()
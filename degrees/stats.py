@@ -0,0 +1,52 @@
+import sys
+from collections import Counter
+
+from graph import load_graph
+
+
+def main():
+    if len(sys.argv) > 2:
+        sys.exit("Usage: python stats.py [directory]")
+    directory = sys.argv[1] if len(sys.argv) == 2 else "large"
+
+    print("Loading data...")
+    graph = load_graph(directory)
+    print("Data loaded.")
+
+    print(f"{graph.num_people} people, {graph.num_movies} movies, "
+          f"{len(graph.person_movies)} credits")
+    sizes = graph.component_sizes
+    print(f"{len(sizes)} connected components, "
+          f"largest has {max(sizes, default=0)} people")
+
+    print("Component sizes (size: components)")
+    print_histogram(Counter(sizes))
+    print("Movies per person (movies: people)")
+    print_histogram(degree_histogram(graph.person_offsets))
+    print("Stars per movie (stars: movies)")
+    print_histogram(degree_histogram(graph.movie_offsets))
+
+
+def degree_histogram(offsets):
+    """
+    Return a Counter of row lengths for a CSR offsets array.
+    """
+    return Counter(offsets[i + 1] - offsets[i] for i in range(len(offsets) - 1))
+
+
+def print_histogram(histogram):
+    """
+    Print a histogram with power-of-two buckets.
+    """
+    buckets = Counter()
+    for value, count in histogram.items():
+        buckets[value.bit_length()] += count
+    for bits in sorted(buckets):
+        low = 0 if bits == 0 else 1 << (bits - 1)
+        high = 0 if bits == 0 else (1 << bits) - 1
+        label = str(low) if low == high else f"{low}-{high}"
+        print(f"  {label}: {buckets[bits]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,9 @@
+from collections import deque
+
+
 class Node():
+    __slots__ = ("state", "parent", "action")
+
     def __init__(self, state, parent, action):
         self.state = state
         self.parent = parent
@@ -6,36 +11,46 @@ class Node():
 
 
 class StackFrontier():
+    """
+    Frontier of search nodes, with states hashed for O(1) membership
+    and an explored set of states that have already been removed.
+
+    States must be hashable. A state is added at most once: `add`
+    ignores nodes whose state is already in the frontier or explored.
+    """
+
     def __init__(self):
-        self.frontier = []
+        self.frontier = deque()
+        self.index = {}
+        self.explored = set()
 
     def add(self, node):
+        if node.state in self.index or node.state in self.explored:
+            return False
         self.frontier.append(node)
+        self.index[node.state] = node
+        return True
 
     def contains_state(self, state):
-        for node in self.frontier:
-            if node.state == state:
-                return node
-        return None
+        return self.index.get(state)
 
     def empty(self):
         return len(self.frontier) == 0
 
+    def _pop(self):
+        return self.frontier.pop()
+
     def remove(self):
         if self.empty():
             raise Exception("empty frontier")
         else:
-            node = self.frontier[-1]
-            self.frontier = self.frontier[:-1]
+            node = self._pop()
+            del self.index[node.state]
+            self.explored.add(node.state)
             return node
 
 
 class QueueFrontier(StackFrontier):
 
-    def remove(self):
-        if self.empty():
-            raise Exception("empty frontier")
-        else:
-            node = self.frontier[0]
-            self.frontier = self.frontier[1:]
-            return node
+    def _pop(self):
+        return self.frontier.popleft()
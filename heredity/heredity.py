@@ -2,6 +2,9 @@ import csv
 import itertools
 import sys
 
+import inference
+import vectorized
+
 PROBS = {
 
     # Unconditional probabilities for having gene
@@ -39,10 +42,39 @@ PROBS = {
 
 def main():
 
+    # Ways of computing probabilities, selectable from the command line
+    methods = {
+        "elimination": lambda people: inference.infer(people, PROBS),
+        "enumeration": enumerate_probabilities,
+        "pruned": pruned_probabilities,
+        "vectorized": lambda people: vectorized.batch_probabilities(people, PROBS),
+    }
+
     # Check for proper usage
-    if len(sys.argv) != 2:
-        sys.exit("Usage: python heredity.py data.csv")
+    if len(sys.argv) not in (2, 3) or (
+            len(sys.argv) == 3 and sys.argv[2] not in methods):
+        sys.exit(f"Usage: python heredity.py data.csv [{'|'.join(methods)}]")
     people = load_data(sys.argv[1])
+    method = methods[sys.argv[2] if len(sys.argv) == 3 else "elimination"]
+
+    # Compute gene and trait probabilities for each person
+    probabilities = method(people)
+
+    # Print results
+    for person in people:
+        print(f"{person}:")
+        for field in probabilities[person]:
+            print(f"  {field.capitalize()}:")
+            for value in probabilities[person][field]:
+                p = probabilities[person][field][value]
+                print(f"    {value}: {p:.4f}")
+
+
+def enumerate_probabilities(people):
+    """
+    Return gene and trait probabilities for every person by summing
+    `joint_probability` over every assignment of genes and traits.
+    """
 
     # Keep track of gene and trait probabilities for each person
     probabilities = {
@@ -83,15 +115,141 @@ def main():
 
     # Ensure probabilities sum to 1
     normalize(probabilities)
+    return probabilities
 
-    # Print results
-    for person in people:
-        print(f"{person}:")
-        for field in probabilities[person]:
-            print(f"  {field.capitalize()}:")
-            for value in probabilities[person][field]:
-                p = probabilities[person][field][value]
-                print(f"    {value}: {p:.4f}")
+
+def pruned_probabilities(people):
+    """
+    Return the same probabilities as `enumerate_probabilities`, but
+    enumerating gene assignments only.
+
+    Observed traits are fixed, and each unobserved trait is summed out
+    analytically: its probability is P(trait | genes) averaged over the
+    person's gene distribution. Assignments come lazily from
+    `gene_assignments`, so nothing is materialized up front.
+    """
+    order, parents, cpts = pedigree_tables(people)
+    gene = [[0, 0, 0] for _ in order]
+    positions = range(len(order))
+    for genes, p in gene_assignments(parents, cpts):
+        for i in positions:
+            gene[i][genes[i]] += p
+
+    probabilities = {}
+    for i, person in enumerate(order):
+        total = sum(gene[i])
+        distribution = {g: gene[i][g] / total for g in (2, 1, 0)}
+        if people[person]["trait"] is None:
+            has_trait = sum(
+                distribution[g] * PROBS["trait"][g][True] for g in distribution)
+        else:
+            has_trait = float(people[person]["trait"])
+        probabilities[person] = {
+            "gene": distribution,
+            "trait": {True: has_trait, False: 1 - has_trait},
+        }
+    return {person: probabilities[person] for person in people}
+
+
+def pedigree_tables(people):
+    """
+    Return (order, parents, cpts) for a family, computed once per call
+    to `pruned_probabilities`.
+
+    `order` lists people with parents before children. For the person
+    at position i, `parents[i]` holds the positions of their mother and
+    father, and `cpts[i][m][f][g]` is the probability of them having g
+    copies of the gene given parents with m and f copies, times the
+    likelihood of their trait if it is observed. Founders point both
+    parents at position len(order), which always holds 0 copies.
+    """
+    order = topological_order(people)
+    position = {person: i for i, person in enumerate(order)}
+    founder = len(order)
+
+    def passes(g):
+        return (PROBS["mutation"], 0.5, 1 - PROBS["mutation"])[g]
+
+    parents = []
+    cpts = []
+    for person in order:
+        data = people[person]
+        if data["trait"] is None:
+            likelihood = (1, 1, 1)
+        else:
+            likelihood = tuple(PROBS["trait"][g][data["trait"]] for g in range(3))
+        if data["mother"] is None:
+            parents.append((founder, founder))
+            row = [PROBS["gene"][g] * likelihood[g] for g in range(3)]
+            cpts.append([[row]])
+            continue
+        parents.append((position[data["mother"]], position[data["father"]]))
+        table = []
+        for m in range(3):
+            table.append([])
+            for f in range(3):
+                pm, pf = passes(m), passes(f)
+                table[m].append([
+                    (1 - pm) * (1 - pf) * likelihood[0],
+                    (pm * (1 - pf) + (1 - pm) * pf) * likelihood[1],
+                    pm * pf * likelihood[2],
+                ])
+        cpts.append(table)
+    return order, parents, cpts
+
+
+def topological_order(people):
+    """
+    Return a list of everyone in `people` with parents before children.
+    Raise ValueError if a parent is missing or someone is their own
+    ancestor.
+    """
+    order = []
+    placed = set()
+    while len(order) < len(people):
+        placed_before = len(order)
+        for person in people:
+            mother = people[person]["mother"]
+            if person not in placed and (
+                    mother is None or
+                    (mother in placed and people[person]["father"] in placed)):
+                order.append(person)
+                placed.add(person)
+        if len(order) == placed_before:
+            raise ValueError("Family has missing parents or is cyclic.")
+    return order
+
+
+def gene_assignments(parents, cpts):
+    """
+    Yield (genes, p) for every assignment of gene counts to the people
+    in the order of `pedigree_tables`, where p is the joint probability
+    of the assignment and the observed traits.
+
+    Assignments are walked depth first, so the product over everyone
+    before position i is shared by every assignment that agrees up to
+    there. `genes` is the same list each time, updated in place, with
+    an extra 0 at the end for founders' parents.
+    """
+    n = len(cpts)
+    if n == 0:
+        return
+    genes = [-1] * n + [0]
+    partial = [1.0] * (n + 1)
+    i = 0
+    while i >= 0:
+        g = genes[i] + 1
+        if g == 3:
+            genes[i] = -1
+            i -= 1
+            continue
+        genes[i] = g
+        mother, father = parents[i]
+        partial[i + 1] = partial[i] * cpts[i][genes[mother]][genes[father]][g]
+        if i + 1 == n:
+            yield genes, partial[n]
+        else:
+            i += 1
 
 
 def load_data(filename):
@@ -230,8 +388,7 @@ def update(probabilities, one_gene, two_genes, have_trait, p):
         person_gene_copies = gene_copies(person, one_gene, two_genes)  # number of genes a person has
         person_trait = trait(person, have_trait)  # trait a person has (TRUE or FALSE)
         probabilities[person]["gene"][person_gene_copies] += p  # update gene values in probabilities
-        probabilities[person]["trait"][person_trait] += p *\
-            PROBS['trait'][person_gene_copies][person_trait]  # update trait values in probabilities
+        probabilities[person]["trait"][person_trait] += p  # update trait values in probabilities
 
 
 def normalize(probabilities):
@@ -0,0 +1,266 @@
+import heapq
+
+import numpy as np
+
+# Gene counts, in the order factor axes are indexed by
+GENES = (0, 1, 2)
+
+
+def transmission(probs):
+    """
+    Return an array of the probability that a parent with 0, 1 or 2
+    copies of the gene passes one on, mutation included.
+    """
+    mutation = probs["mutation"]
+    return np.array([mutation, 0.5, 1 - mutation])
+
+
+def inheritance_table(probs):
+    """
+    Return a 3 x 3 x 3 array of P(child genes | mother genes, father
+    genes), indexed [child, mother, father].
+    """
+    t = transmission(probs)
+    m, f = t[:, None], t[None, :]
+    return np.stack([
+        (1 - m) * (1 - f),
+        m * (1 - f) + (1 - m) * f,
+        m * f,
+    ])
+
+
+def trait_table(probs):
+    """
+    Return a 3 x 2 array of P(trait | genes), indexed [genes, trait]
+    with False before True.
+    """
+    return np.array([
+        [probs["trait"][g][False], probs["trait"][g][True]] for g in GENES
+    ])
+
+
+def gene_prior(probs):
+    return np.array([probs["gene"][g] for g in GENES])
+
+
+class Factor():
+    """
+    A table over gene-count variables: `values` has one axis of
+    length 3 per name in `variables`.
+    """
+
+    def __init__(self, variables, values):
+        self.variables = tuple(variables)
+        self.values = values
+
+
+def multiply(factors, keep):
+    """
+    Return the product of `factors` summed over every variable not in
+    `keep`, as a Factor over `keep`.
+    """
+    if not factors:
+        return Factor(keep, np.ones((3,) * len(keep)))
+    index = {}
+    for factor in factors:
+        for v in factor.variables:
+            index.setdefault(v, len(index))
+    for v in keep:
+        if v not in index:
+            # Variables no factor mentions are uniform
+            index[v] = len(index)
+            factors = factors + [Factor([v], np.ones(3))]
+    operands = []
+    for factor in factors:
+        operands.append(factor.values)
+        operands.append([index[v] for v in factor.variables])
+    values = np.einsum(*operands, [index[v] for v in keep])
+    return Factor(keep, values)
+
+
+def scaled(factor):
+    """
+    Return `factor` divided by its largest value. Messages only matter
+    up to a constant, and scaling them keeps long chains of evidence
+    from underflowing.
+    """
+    factor.values = factor.values / factor.values.max()
+    return factor
+
+
+def pedigree_factors(people, probs):
+    """
+    Return a dictionary mapping each person to the Factor over their
+    genes and their parents' genes: the prior or inheritance table,
+    times the likelihood of their trait if it is known.
+    """
+    inherit = inheritance_table(probs)
+    traits = trait_table(probs)
+    factors = {}
+    for person, data in people.items():
+        if data["mother"] is None:
+            factor = Factor([person], gene_prior(probs))
+        else:
+            factor = Factor([person, data["mother"], data["father"]], inherit)
+        if data["trait"] is not None:
+            evidence = traits[:, int(data["trait"])]
+            shape = (3,) + (1,) * (len(factor.variables) - 1)
+            factor.values = factor.values * evidence.reshape(shape)
+        factors[person] = factor
+    return factors
+
+
+def moral_graph(factors):
+    """
+    Return a dictionary mapping each variable to the set of variables
+    it shares a factor with.
+    """
+    neighbors = {}
+    for factor in factors:
+        for v in factor.variables:
+            neighbors.setdefault(v, set()).update(factor.variables)
+    for v in neighbors:
+        neighbors[v].discard(v)
+    return neighbors
+
+
+def eliminate(neighbors, v):
+    """
+    Remove `v` from the graph `neighbors`, connecting all of its
+    neighbors to each other, and return the set of them.
+    """
+    ns = neighbors.pop(v)
+    for a in ns:
+        neighbors[a].update(ns)
+        neighbors[a].discard(a)
+        neighbors[a].discard(v)
+    return ns
+
+
+def elimination_order(factors):
+    """
+    Return an order to eliminate every variable in, picking the one
+    whose elimination adds the fewest fill-in edges to the moral graph
+    at each step, ties broken by fewest neighbors.
+
+    Scores sit in a heap and are only recomputed for the neighbors of
+    each eliminated variable, and for stale entries when they surface.
+    """
+    neighbors = moral_graph(factors)
+
+    def score(v):
+        ns = list(neighbors[v])
+        fill = sum(1 for i, a in enumerate(ns) for b in ns[i + 1:]
+                   if b not in neighbors[a])
+        return (fill, len(ns), v)
+
+    heap = [score(v) for v in neighbors]
+    heapq.heapify(heap)
+    order = []
+    while heap:
+        entry = heapq.heappop(heap)
+        v = entry[2]
+        if v not in neighbors:
+            continue
+        current = score(v)
+        if current > entry:
+            heapq.heappush(heap, current)
+            continue
+        for a in eliminate(neighbors, v):
+            heapq.heappush(heap, score(a))
+        order.append(v)
+    return order
+
+
+class JunctionTree():
+    """
+    Clusters formed by eliminating variables in order: the cluster of
+    variable `v` covers `v` and its neighbors at the time, and its
+    parent is the cluster of the next of those neighbors eliminated.
+    Each factor is assigned to the cluster of the first of its
+    variables to be eliminated.
+
+    `calibrate` runs one upward and one downward pass of sum-product
+    messages, after which each cluster's belief is its joint marginal.
+    """
+
+    def __init__(self, factors, order):
+        position = {v: i for i, v in enumerate(order)}
+        scopes = {}
+        potentials = {v: [] for v in order}
+        for factor in factors:
+            first = min(factor.variables, key=position.get)
+            potentials[first].append(factor)
+        neighbors = moral_graph(factors)
+        for v in order:
+            scope = eliminate(neighbors, v)
+            scopes[v] = (v,) + tuple(sorted(scope, key=position.get))
+        self.order = order
+        self.scopes = scopes
+        self.potentials = potentials
+        self.parent = {}
+        self.children = {v: [] for v in order}
+        for v in order:
+            rest = scopes[v][1:]
+            if rest:
+                self.parent[v] = rest[0]
+                self.children[rest[0]].append(v)
+        self.up = {}
+        self.down = {}
+
+    def separator(self, v):
+        return self.scopes[v][1:]
+
+    def calibrate(self):
+        for v in self.order:
+            if v in self.parent:
+                incoming = [self.up[c] for c in self.children[v]]
+                self.up[v] = scaled(multiply(
+                    self.potentials[v] + incoming, self.separator(v)))
+        for v in reversed(self.order):
+            for c in self.children[v]:
+                incoming = [self.up[o] for o in self.children[v] if o != c]
+                if v in self.down:
+                    incoming.append(self.down[v])
+                self.down[c] = scaled(multiply(
+                    self.potentials[v] + incoming, self.separator(c)))
+
+    def marginal(self, v):
+        """
+        Return the normalized marginal distribution of variable `v`.
+        """
+        incoming = [self.up[c] for c in self.children[v]]
+        if v in self.down:
+            incoming.append(self.down[v])
+        values = multiply(self.potentials[v] + incoming, (v,)).values
+        return values / values.sum()
+
+
+def infer(people, probs):
+    """
+    Return gene and trait probabilities for every person, in the same
+    form as `heredity.main` builds, by exact inference on the pedigree
+    as a Bayesian network with the tables in `probs`.
+
+    Unobserved traits sum out of the joint, so only gene variables are
+    eliminated; their marginals come from a calibrated junction tree,
+    which for tree-shaped pedigrees has clusters of at most three
+    people and so takes time linear in the size of the family.
+    """
+    factors = pedigree_factors(people, probs)
+    tree = JunctionTree(list(factors.values()),
+                        elimination_order(factors.values()))
+    tree.calibrate()
+    traits = trait_table(probs)
+    probabilities = {}
+    for person, data in people.items():
+        genes = tree.marginal(person)
+        if data["trait"] is None:
+            has_trait = float(genes @ traits[:, 1])
+        else:
+            has_trait = float(data["trait"])
+        probabilities[person] = {
+            "gene": {g: float(genes[g]) for g in (2, 1, 0)},
+            "trait": {True: has_trait, False: 1 - has_trait},
+        }
+    return probabilities
@@ -0,0 +1,451 @@
+import concurrent.futures
+import os
+import sys
+import time
+
+import numpy as np
+
+from heredity import PROBS, load_data, topological_order
+from inference import gene_prior, inheritance_table, trait_table
+
+# Total samples drawn when no budget is given
+SAMPLES = 10 ** 6
+
+# Particles drawn together in one round of likelihood weighting
+PARTICLES = 1000
+
+# Walkers advanced together by one Gibbs chain
+WALKERS = 256
+
+# Sweeps each Gibbs walker makes before its samples count
+BURN_IN = 100
+
+# Batches each chain's samples are grouped into for error estimates
+BATCHES = 16
+
+# Fewest effective samples whose spread is trusted as an error estimate
+MIN_EFFECTIVE = 100
+
+# Normal quantile for a 95% confidence interval
+Z = 1.96
+
+
+def main():
+    if len(sys.argv) not in (2, 3, 4) or (
+            len(sys.argv) > 2 and sys.argv[2] not in METHODS):
+        sys.exit(f"Usage: python sampling.py data.csv "
+                 f"[{'|'.join(METHODS)}] [samples|seconds s]")
+    people = load_data(sys.argv[1])
+    method = sys.argv[2] if len(sys.argv) > 2 else "gibbs"
+    samples, seconds = SAMPLES, None
+    if len(sys.argv) == 4:
+        budget = sys.argv[3]
+        try:
+            if budget.endswith("s"):
+                samples, seconds = None, float(budget[:-1])
+            else:
+                samples = int(budget)
+        except ValueError:
+            sys.exit("Budget must be a number of samples, or of seconds "
+                     "followed by s.")
+
+    result = sample_probabilities(
+        people, PROBS, method, samples=samples, seconds=seconds)
+    for person in people:
+        print(f"{person}:")
+        for field in result.probabilities[person]:
+            print(f"  {field.capitalize()}:")
+            for value in result.probabilities[person][field]:
+                p = result.probabilities[person][field][value]
+                error = result.errors[person][field][value]
+                print(f"    {value}: {p:.4f} ± {Z * error:.4f}")
+    print(f"{result.samples} samples in {result.chains} chains "
+          f"(seed {result.seed}), {result.effective:.0f} effective, "
+          f"largest R-hat {result.rhat:.3f}")
+    if result.effective < MIN_EFFECTIVE:
+        print(f"Fewer than {MIN_EFFECTIVE} effective samples, so the "
+              f"errors are unknown.")
+
+
+class Pedigree():
+    """
+    A family as arrays over people in topological order: the column of
+    each parent (-1 for founders), each trait coded 1, 0 or -1 for
+    unknown, and for each person the (child, other parent, is mother)
+    triples the Gibbs conditionals need.
+    """
+
+    def __init__(self, people, probs):
+        self.order = topological_order(people)
+        column = {person: i for i, person in enumerate(self.order)}
+        self.mothers = []
+        self.fathers = []
+        self.traits = []
+        self.children = [[] for _ in self.order]
+        for i, person in enumerate(self.order):
+            data = people[person]
+            mother = column.get(data["mother"], -1)
+            father = column.get(data["father"], -1)
+            self.mothers.append(mother)
+            self.fathers.append(father)
+            self.traits.append(-1 if data["trait"] is None else int(data["trait"]))
+            if mother != -1:
+                self.children[mother].append((i, father, True))
+                self.children[father].append((i, mother, False))
+        self.prior = gene_prior(probs)
+        self.inherit = inheritance_table(probs)
+        self.likelihood = trait_table(probs)
+
+
+class SamplingResult():
+    """
+    Estimated gene and trait probabilities from several chains.
+
+    `probabilities` and `errors` have the form `heredity.main` prints,
+    holding estimates and their standard errors. `rhat` is the largest
+    split R-hat over every estimate, close to 1 when the chains agree.
+    `effective` is the effective sample size implied by the sample
+    weights, which for Gibbs sampling is just the number of samples;
+    below MIN_EFFECTIVE every error is infinite. `seed` reproduces the
+    run.
+    """
+
+    def __init__(self, probabilities, errors, rhat, samples, effective,
+                 chains, seed):
+        self.probabilities = probabilities
+        self.errors = errors
+        self.rhat = rhat
+        self.samples = samples
+        self.effective = effective
+        self.chains = chains
+        self.seed = seed
+
+
+def sample_probabilities(people, probs, method="gibbs", samples=SAMPLES,
+                         seconds=None, chains=None, seed=None):
+    """
+    Estimate gene and trait probabilities with `method`, "weighting" or
+    "gibbs", running `chains` independent chains on a process pool.
+
+    The budget is `samples` in total or, if given, `seconds` of
+    sampling per chain. Unobserved traits are never sampled: each
+    sample contributes P(trait | genes), which has lower variance.
+    R-hat comes from the halves of each chain.
+
+    Errors are the larger of the weighted spread of per-batch estimates
+    across every chain (batch means) and sqrt(p (1 - p) / ESS), which
+    still holds when a few heavy samples land in one batch. With fewer
+    than MIN_EFFECTIVE effective samples they are infinite, since a
+    handful of samples says nothing about its own spread.
+    """
+    if chains is None:
+        chains = os.cpu_count() or 1
+    pedigree = Pedigree(people, probs)
+    root = np.random.SeedSequence(seed)
+    deadline = None if seconds is None else time.time() + seconds
+    per_chain = None if samples is None else max(1, -(-samples // chains))
+    with concurrent.futures.ProcessPoolExecutor(chains) as pool:
+        runs = list(pool.map(
+            METHODS[method], [pedigree] * chains, root.spawn(chains),
+            [per_chain] * chains, [deadline] * chains))
+
+    # Put every chain's weights on the scale of the largest
+    scale = max(run.log_scale for run in runs)
+    weights, genes, squares, counts = [], [], 0.0, 0
+    for run in runs:
+        factor = np.exp(run.log_scale - scale)
+        weights.append(run.weights * factor)
+        genes.append(run.genes * factor)
+        squares += run.squares * factor ** 2
+        counts += run.samples
+    total = sum(w.sum() for w in weights)
+    overall = _marginals(
+        pedigree, sum(g.sum(axis=0) for g in genes)[None], total[None])[0]
+
+    # Each batch estimate is a ratio of sums, so batches count in
+    # proportion to their weight. Chains on a time budget can fill
+    # different numbers of batches, but R-hat needs the same number.
+    estimates = [_marginals(pedigree, g, w) for g, w in zip(genes, weights)]
+    batches = np.concatenate(estimates)
+    batch_weights = np.concatenate(weights)[:, None, None]
+    b = len(batches)
+    effective = total ** 2 / squares
+    if b < 2 or effective < MIN_EFFECTIVE:
+        errors = np.full(overall.shape, np.inf)
+    else:
+        # Batches whose weight underflowed to zero have no estimate
+        spread = np.where(batch_weights > 0, batches - overall, 0)
+        errors = np.maximum(
+            np.sqrt((batch_weights ** 2 * spread ** 2).sum(axis=0)
+                    * b / (b - 1)) / total,
+            np.sqrt(overall * (1 - overall) / effective))
+    used = min(len(e) for e in estimates)
+    rhat = _split_rhat(np.stack([e[:used] for e in estimates]))
+
+    probabilities, standard_errors = {}, {}
+    for i, person in enumerate(pedigree.order):
+        probabilities[person] = {
+            "gene": {g: float(overall[i, g]) for g in (2, 1, 0)},
+            "trait": {True: float(overall[i, 3]),
+                      False: float(1 - overall[i, 3])},
+        }
+        standard_errors[person] = {
+            "gene": {g: float(errors[i, g]) for g in (2, 1, 0)},
+            "trait": {True: float(errors[i, 3]), False: float(errors[i, 3])},
+        }
+    return SamplingResult(
+        {person: probabilities[person] for person in people},
+        {person: standard_errors[person] for person in people},
+        rhat, counts, effective, chains, root.entropy)
+
+
+class Chain():
+    """
+    One chain's output: per-batch sums of gene probabilities (batches x
+    people x 3) and of sample weights, and the sum of squared weights,
+    all to be multiplied by exp(`log_scale`), and the number of samples
+    drawn.
+    """
+
+    def __init__(self, genes, weights, squares, log_scale, samples):
+        self.genes = genes
+        self.weights = weights
+        self.squares = squares
+        self.log_scale = log_scale
+        self.samples = samples
+
+
+class Batches():
+    """
+    BATCHES running sums that grow to cover any number of rounds: when
+    all 2 * BATCHES slots fill up, neighboring slots merge and each
+    slot covers twice as many rounds from then on.
+    """
+
+    def __init__(self, n):
+        self.genes = np.zeros((2 * BATCHES, n, 3))
+        self.weights = np.zeros(2 * BATCHES)
+        self.squares = 0.0
+        self.log_scale = -np.inf
+        self.rounds = 0
+        self.size = 1
+
+    def add(self, genes, weights, squares, log_scale=0.0):
+        """
+        Add one round's weighted gene sums, total weight and sum of
+        squared weights, all given relative to exp(`log_scale`).
+        """
+        if log_scale > self.log_scale:
+            factor = np.exp(self.log_scale - log_scale)
+            self.genes *= factor
+            self.weights *= factor
+            self.squares *= factor ** 2
+            self.log_scale = log_scale
+        factor = np.exp(log_scale - self.log_scale)
+        slot = self.rounds // self.size
+        if slot == len(self.weights):
+            self.genes[:BATCHES] = self.genes[0::2] + self.genes[1::2]
+            self.weights[:BATCHES] = self.weights[0::2] + self.weights[1::2]
+            self.genes[BATCHES:] = 0
+            self.weights[BATCHES:] = 0
+            self.size *= 2
+            slot = self.rounds // self.size
+        self.genes[slot] += genes * factor
+        self.weights[slot] += weights * factor
+        self.squares += squares * factor ** 2
+        self.rounds += 1
+
+    def chain(self, samples):
+        used = -(-self.rounds // self.size)
+        return Chain(self.genes[:used], self.weights[:used], self.squares,
+                     self.log_scale, samples)
+
+
+def likelihood_weighting(pedigree, seed, samples, deadline):
+    """
+    Run one chain of likelihood weighting: draw genes for everyone from
+    the prior and inheritance tables, and weight each particle by the
+    likelihood of the observed traits. Rounds of up to PARTICLES
+    particles are drawn until `samples` or `deadline` is reached.
+    """
+    rng = np.random.default_rng(seed)
+    n = len(pedigree.order)
+    batches = Batches(n)
+    particles = _round_size(PARTICLES, samples)
+    drawn = 0
+    while _continue(drawn, samples, deadline, batches.rounds):
+        m = particles if samples is None else min(particles, samples - drawn)
+        genes, log_weights = _forward_sample(pedigree, rng, m)
+        log_scale = log_weights.max()
+        weights = np.exp(log_weights - log_scale)
+        batches.add(_one_hot(genes, weights), weights.sum(),
+                    (weights ** 2).sum(), log_scale)
+        drawn += m
+    return batches.chain(drawn)
+
+
+def gibbs_sampling(pedigree, seed, samples, deadline):
+    """
+    Run one chain of up to WALKERS Gibbs samplers side by side. Each
+    sweep redraws every person's genes from their distribution given
+    their parents, children, the children's other parents and their
+    own observed trait. After BURN_IN sweeps, or as many as fit before
+    `deadline`, each sweep adds that conditional distribution for
+    every walker as one sample each.
+    """
+    rng = np.random.default_rng(seed)
+    batches = Batches(len(pedigree.order))
+    walkers = _round_size(WALKERS, samples)
+    genes, _ = _forward_sample(pedigree, rng, walkers)
+    for _ in range(BURN_IN):
+        if deadline is not None and time.time() >= deadline:
+            break
+        _sweep(pedigree, rng, genes, 0)
+    drawn = 0
+    while _continue(drawn, samples, deadline, batches.rounds):
+        m = walkers if samples is None else min(walkers, samples - drawn)
+        batches.add(_sweep(pedigree, rng, genes, m), m, m)
+        drawn += m
+    return batches.chain(drawn)
+
+
+def _sweep(pedigree, rng, genes, m):
+    """
+    Redraw every person's genes in place for each walker in `genes`,
+    returning a people x 3 matrix of the conditional distributions
+    summed over the first `m` walkers.
+    """
+    totals = np.zeros((len(pedigree.order), 3))
+    for i in range(len(pedigree.order)):
+        conditional = _conditional(pedigree, genes, i)
+        genes[:, i] = _categorical(rng, conditional)
+        totals[i] = conditional[:m].sum(axis=0)
+    return totals
+
+
+METHODS = {
+    "gibbs": gibbs_sampling,
+    "weighting": likelihood_weighting,
+}
+
+
+def _round_size(size, samples):
+    """
+    Return how many samples to draw per round: `size`, or fewer if a
+    budget of `samples` would not fill 2 * BATCHES rounds of it.
+    """
+    if samples is None:
+        return size
+    return max(1, min(size, -(-samples // (2 * BATCHES))))
+
+
+def _continue(drawn, samples, deadline, rounds):
+    """
+    Return whether a chain should draw another round: until its budget
+    runs out, but always at least one so there is an estimate.
+    """
+    if rounds == 0:
+        return True
+    if deadline is not None:
+        return time.time() < deadline
+    return drawn < samples
+
+
+def _forward_sample(pedigree, rng, m):
+    """
+    Return `m` gene assignments drawn from the prior and inheritance
+    tables, as an int8 matrix of particles x people, and the log
+    likelihood of the observed traits under each.
+    """
+    genes = np.empty((m, len(pedigree.order)), dtype=np.int8)
+    log_weights = np.zeros(m)
+    for i, trait in enumerate(pedigree.traits):
+        mother, father = pedigree.mothers[i], pedigree.fathers[i]
+        if mother == -1:
+            p = np.broadcast_to(pedigree.prior, (m, 3))
+        else:
+            p = pedigree.inherit[:, genes[:, mother], genes[:, father]].T
+        genes[:, i] = _categorical(rng, p)
+        if trait != -1:
+            log_weights += np.log(pedigree.likelihood[genes[:, i], trait])
+    return genes, log_weights
+
+
+def _conditional(pedigree, genes, i):
+    """
+    Return, for every walker in `genes`, the normalized distribution of
+    person `i`'s genes given everyone else's.
+    """
+    mother, father = pedigree.mothers[i], pedigree.fathers[i]
+    if mother == -1:
+        p = np.tile(pedigree.prior, (len(genes), 1))
+    else:
+        p = pedigree.inherit[:, genes[:, mother], genes[:, father]].T.copy()
+    if pedigree.traits[i] != -1:
+        p *= pedigree.likelihood[:, pedigree.traits[i]]
+    for child, other, is_mother in pedigree.children[i]:
+        if is_mother:
+            p *= pedigree.inherit[genes[:, child], :, genes[:, other]]
+        else:
+            p *= pedigree.inherit[genes[:, child], genes[:, other], :]
+    return p / p.sum(axis=1, keepdims=True)
+
+
+def _categorical(rng, p):
+    """
+    Return one draw from each row of `p`, a matrix of distributions
+    over 0, 1 and 2.
+    """
+    cumulative = np.cumsum(p, axis=1)
+    u = rng.random(len(p)) * cumulative[:, -1]
+    return (u[:, None] >= cumulative[:, :2]).sum(axis=1).astype(np.int8)
+
+
+def _one_hot(genes, weights):
+    """
+    Return a people x 3 matrix of the total weight of the particles in
+    `genes` with each gene count.
+    """
+    return np.stack([
+        np.bincount(column, weights=weights, minlength=3)
+        for column in genes.T])
+
+
+def _marginals(pedigree, genes, weights):
+    """
+    Return, for each batch, a people x 4 matrix of P(0, 1, 2 genes)
+    and P(trait) from summed gene probabilities and weights.
+    """
+    marginals = np.empty(genes.shape[:2] + (4,))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        marginals[..., :3] = genes / weights[:, None, None]
+    marginals[..., 3] = marginals[..., :3] @ pedigree.likelihood[:, 1]
+    for i, trait in enumerate(pedigree.traits):
+        if trait != -1:
+            marginals[:, i, 3] = trait
+    return marginals
+
+
+def _split_rhat(estimates):
+    """
+    Return the largest split R-hat over every marginal, treating the
+    batch estimates of each half of each chain (chains x batches x
+    ...) as one sequence of draws.
+    """
+    chains, batches = estimates.shape[:2]
+    half = batches // 2
+    if half < 2:
+        return float("nan")
+    sequences = estimates[:, :2 * half].reshape(
+        chains * 2, half, *estimates.shape[2:])
+    within = sequences.var(axis=1, ddof=1).mean(axis=0)
+    between = half * sequences.mean(axis=1).var(axis=0, ddof=1)
+    pooled = (half - 1) / half * within + between / half
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rhat = np.sqrt(pooled / within)
+    rhat = rhat[within > 0]
+    return float(rhat.max()) if len(rhat) else 1.0
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+import numpy as np
+
+from inference import gene_prior, inheritance_table, trait_table
+
+# Gene assignments evaluated together in one batch
+BLOCK = 1 << 16
+
+
+def gene_matrix(start, stop, n):
+    """
+    Return an int8 matrix of assignments x people holding gene counts
+    for assignments `start` to `stop`, where assignment `a` gives
+    person `j` digit `j` of `a` written in base 3.
+    """
+    codes = np.arange(start, stop, dtype=np.int64)
+    powers = 3 ** np.arange(n, dtype=np.int64)
+    return (codes[:, None] // powers % 3).astype(np.int8)
+
+
+def encode_traits(people, order):
+    """
+    Return an int8 vector of each person's trait: 1 if they have it, 0
+    if they don't and -1 if it is unknown.
+    """
+    return np.array([
+        -1 if people[p]["trait"] is None else int(people[p]["trait"])
+        for p in order
+    ], dtype=np.int8)
+
+
+def batch_joint_probability(genes, traits, founders, children, mothers,
+                            fathers, probs):
+    """
+    Return the joint probability of every row of `genes`, an int8
+    matrix of assignments x people, together with `traits`, a vector or
+    matrix of trait codes from `encode_traits` that broadcasts against
+    it. An unknown trait, -1, is summed out.
+
+    `founders` and `children` are column indices into `genes`, and
+    `mothers` and `fathers` the columns of each child's parents.
+    """
+    # Trait likelihoods with a last column of ones for unknown traits
+    likelihood = np.hstack([trait_table(probs), np.ones((3, 1))])
+    traits = np.broadcast_to(traits, genes.shape)
+    p = likelihood[genes, traits].prod(axis=1)
+    p *= gene_prior(probs)[genes[:, founders]].prod(axis=1)
+    p *= inheritance_table(probs)[
+        genes[:, children], genes[:, mothers], genes[:, fathers]].prod(axis=1)
+    return p
+
+
+def batch_probabilities(people, probs, block=BLOCK):
+    """
+    Return gene and trait probabilities for every person, in the same
+    form as `heredity.main` builds, by evaluating all 3^n gene
+    assignments `block` at a time with `batch_joint_probability`.
+
+    Observed traits are fixed and unobserved ones are summed out, so
+    trait probabilities follow from each person's gene distribution.
+    """
+    order = list(people)
+    n = len(order)
+    column = {person: j for j, person in enumerate(order)}
+    founders = [j for j, p in enumerate(order) if people[p]["mother"] is None]
+    children = [j for j, p in enumerate(order) if people[p]["mother"] is not None]
+    mothers = [column[people[order[j]]["mother"]] for j in children]
+    fathers = [column[people[order[j]]["father"]] for j in children]
+    traits = encode_traits(people, order)
+
+    gene = np.zeros((n, 3))
+    people_index = np.arange(n)
+    for start in range(0, 3 ** n, block):
+        genes = gene_matrix(start, min(start + block, 3 ** n), n)
+        p = batch_joint_probability(
+            genes, traits, founders, children, mothers, fathers, probs)
+        np.add.at(gene, (people_index, genes), p[:, None])
+
+    gene /= gene.sum(axis=1, keepdims=True)
+    has_trait = gene @ trait_table(probs)[:, 1]
+    probabilities = {}
+    for j, person in enumerate(order):
+        if traits[j] != -1:
+            has_trait[j] = traits[j]
+        probabilities[person] = {
+            "gene": {g: float(gene[j, g]) for g in (2, 1, 0)},
+            "trait": {True: float(has_trait[j]),
+                      False: 1 - float(has_trait[j])},
+        }
+    return probabilities
@@ -0,0 +1,199 @@
+import os
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from crawler import crawl_links, save_adjacency, to_csr
+from pagerank import DAMPING, power_iteration, random_surfer, transition_matrix
+
+# Largest corpus benchmarked when none is given
+MAX_PAGES = 10 ** 5
+
+# Largest corpus also written out as HTML and crawled
+HTML_LIMIT = 10 ** 4
+
+# Average number of links per page
+AVERAGE_LINKS = 8
+
+# Random surfer samples drawn per page
+SAMPLES_PER_PAGE = 100
+
+
+def main():
+    if len(sys.argv) == 5 and sys.argv[1] == "generate":
+        generate(sys.argv[2], int(sys.argv[3]), sys.argv[4])
+        return
+    if len(sys.argv) > 2:
+        sys.exit("Usage: python benchmark.py [max_pages]\n"
+                 "       python benchmark.py generate graph pages path")
+    max_pages = int(sys.argv[1]) if len(sys.argv) == 2 else MAX_PAGES
+    sizes = [10 ** e for e in range(2, 7) if 10 ** e <= max_pages]
+
+    print(f"{'graph':>9} {'pages':>8} {'links':>9} {'stage':>8} "
+          f"{'seconds':>8} {'peak MiB':>9}  notes")
+    for name, generator in GENERATORS.items():
+        for n in sizes:
+            rng = np.random.default_rng(n)
+            offsets, links = generator(n, AVERAGE_LINKS, rng)
+            for stage, seconds, peak, notes in run_stages(offsets, links, rng):
+                print(f"{name:>9} {n:>8} {len(links):>9} {stage:>8} "
+                      f"{seconds:>8.3f} {peak / 2 ** 20:>9.1f}  {notes}")
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f"Peak RSS {max_rss / 1024:.1f} MiB")
+
+
+def generate(name, n, path):
+    """
+    Write a synthetic graph to `path`: a binary adjacency file if it
+    ends in `.adjacency`, or else a directory of HTML pages.
+    """
+    if name not in GENERATORS:
+        sys.exit(f"Graph must be one of {', '.join(GENERATORS)}.")
+    offsets, links = GENERATORS[name](n, AVERAGE_LINKS, np.random.default_rng(n))
+    if path.endswith(".adjacency"):
+        write_edge_list(path, offsets, links)
+    else:
+        os.makedirs(path, exist_ok=True)
+        write_html(path, offsets, links)
+
+
+def run_stages(offsets, links, rng):
+    """
+    Time crawling (for corpora up to HTML_LIMIT pages), sampling and
+    iteration on one graph, yielding (stage, seconds, peak bytes,
+    notes) for each.
+    """
+    n = len(offsets) - 1
+    if n <= HTML_LIMIT:
+        with tempfile.TemporaryDirectory() as directory:
+            write_html(directory, offsets, links)
+            corpus, seconds, peak = measure(crawl_links, directory)
+            pages = [f"{i}.html" for i in range(n)]
+            crawled = to_csr(pages, corpus)
+            same = np.array_equal(crawled[0], offsets) and np.array_equal(
+                crawled[1], links)
+            yield "crawl", seconds, peak, "links match" if same else "LINKS DIFFER"
+
+    samples = SAMPLES_PER_PAGE * n
+    visits, seconds, peak = measure(
+        random_surfer, offsets, links, DAMPING, samples, rng=rng)
+    yield "sample", seconds, peak, f"{samples} samples"
+
+    (ranks, iterations), seconds, peak = measure(
+        lambda: power_iteration(*transition_matrix(offsets, links), DAMPING))
+    error = np.abs(visits / samples - ranks).sum()
+    yield "iterate", seconds, peak, (
+        f"{iterations} iterations, L1 from sampled ranks {error:.4f}")
+
+
+def measure(function, *args, **kwargs):
+    """
+    Return (result, seconds, peak traced bytes) for one call.
+    """
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, seconds, peak
+
+
+def _to_csr(n, sources, targets):
+    """
+    Return CSR (offsets, links) for edges, dropping self-links and
+    duplicates as crawl does.
+    """
+    keep = sources != targets
+    codes = np.unique(sources[keep].astype(np.int64) * n + targets[keep])
+    sources, targets = np.divmod(codes, n)
+    offsets = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(sources, minlength=n), out=offsets[1:])
+    return offsets, targets
+
+
+def erdos_renyi(n, average_links, rng):
+    """
+    Return a graph where every page links to uniformly random pages,
+    with a Poisson-distributed number of links.
+    """
+    degrees = rng.poisson(average_links, size=n)
+    sources = np.repeat(np.arange(n), degrees)
+    targets = rng.integers(n, size=len(sources))
+    return _to_csr(n, sources, targets)
+
+
+def popular_pages(n, count, rng, exponent=2.1):
+    """
+    Return `count` pages drawn with probability proportional to
+    rank^-1/(exponent - 1) over a random popularity order, so that
+    pages picked this way get power-law in-degrees.
+    """
+    weights = np.arange(1, n + 1, dtype=float) ** (-1 / (exponent - 1))
+    cumulative = np.cumsum(weights)
+    ranks = np.searchsorted(cumulative, rng.random(count) * cumulative[-1])
+    return rng.permutation(n)[np.minimum(ranks, n - 1)]
+
+
+def power_law(n, average_links, rng):
+    """
+    Return a graph whose in-degrees follow a power law.
+    """
+    degrees = rng.poisson(average_links, size=n)
+    sources = np.repeat(np.arange(n), degrees)
+    return _to_csr(n, sources, popular_pages(n, len(sources), rng))
+
+
+def web_like(n, average_links, rng, site_size=50, dangling=0.1):
+    """
+    Return a graph like a web crawl: pages group into sites, most links
+    stay within the page's site, the rest go to popular pages
+    elsewhere, out-degrees are heavy-tailed and some pages have no
+    links at all.
+    """
+    degrees = np.minimum(rng.zipf(2.0, size=n) * average_links // 2, n - 1)
+    degrees[rng.random(n) < dangling] = 0
+    sources = np.repeat(np.arange(n), degrees)
+    site_start = sources - sources % site_size
+    local = np.minimum(
+        site_start + rng.integers(site_size, size=len(sources)), n - 1)
+    remote = popular_pages(n, len(sources), rng)
+    targets = np.where(rng.random(len(sources)) < 0.8, local, remote)
+    return _to_csr(n, sources, targets)
+
+
+GENERATORS = {
+    "erdos": erdos_renyi,
+    "powerlaw": power_law,
+    "web": web_like,
+}
+
+
+def write_html(directory, offsets, links):
+    """
+    Write a graph as a directory of HTML pages named `0.html`, ...
+    """
+    for i in range(len(offsets) - 1):
+        anchors = "\n".join(
+            f'            <li><a href="{j}.html">{j}</a></li>'
+            for j in links[offsets[i]:offsets[i + 1]])
+        with open(os.path.join(directory, f"{i}.html"), "w") as f:
+            f.write(f"<!DOCTYPE html>\n<html>\n    <body>\n        <ul>\n"
+                    f"{anchors}\n        </ul>\n    </body>\n</html>\n")
+
+
+def write_edge_list(path, offsets, links):
+    """
+    Write a graph as a binary adjacency file that `crawler.load_adjacency`
+    can memory-map.
+    """
+    pages = [f"{i}.html" for i in range(len(offsets) - 1)]
+    save_adjacency(path, None, pages, offsets, links)
+
+
+if __name__ == "__main__":
+    main()
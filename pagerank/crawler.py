@@ -0,0 +1,246 @@
+import concurrent.futures
+import json
+import os
+import posixpath
+import struct
+import sys
+from html.parser import HTMLParser
+from urllib.parse import unquote, urlsplit
+
+import numpy as np
+
+# Bytes of HTML fed to the parser at a time
+CHUNK_SIZE = 1 << 16
+
+# Files handed to each worker task
+CHUNKSIZE = 64
+
+ADJACENCY_NAME = "links.adjacency"
+ADJACENCY_MAGIC = b"PAGERANK"
+ADJACENCY_VERSION = 1
+
+
+def main():
+    if len(sys.argv) != 2:
+        sys.exit("Usage: python crawler.py corpus")
+    pages, offsets, links = load_or_crawl(sys.argv[1])
+    print(f"{len(pages)} pages, {len(links)} links")
+
+
+class LinkParser(HTMLParser):
+    """
+    Incremental HTML parser that collects the href of every <a> tag.
+    Text can be fed in chunks of any size, since HTMLParser buffers
+    partial tags between calls to `feed`.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.hrefs = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "a":
+            for name, value in attrs:
+                if name == "href" and value is not None:
+                    self.hrefs.append(value)
+
+    handle_startendtag = handle_starttag
+
+
+def extract_links(directory, page):
+    """
+    Return the set of normalized pages that `page` links to, reading
+    its file in CHUNK_SIZE pieces.
+    """
+    parser = LinkParser()
+    path = os.path.join(directory, *page.split("/"))
+    with open(path, encoding="utf-8", errors="replace") as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            parser.feed(chunk)
+    parser.close()
+    links = set()
+    for href in parser.hrefs:
+        link = normalize_link(page, href)
+        if link is not None:
+            links.add(link)
+    return links
+
+
+def normalize_link(page, href):
+    """
+    Return the corpus-relative page an href on `page` points to, or
+    None if it leaves the corpus.
+
+    Relative hrefs are resolved against the page's own directory and
+    hrefs starting with `/` against the corpus root. Query strings and
+    fragments are dropped; hrefs with a scheme or host are external.
+    """
+    parts = urlsplit(href.strip())
+    if parts.scheme or parts.netloc:
+        return None
+    path = unquote(parts.path)
+    if not path:
+        return None
+    if path.startswith("/"):
+        path = path.lstrip("/")
+    else:
+        path = posixpath.join(posixpath.dirname(page), path)
+    path = posixpath.normpath(path)
+    if path == "." or path == ".." or path.startswith("../"):
+        return None
+    return path
+
+
+def list_pages(directory):
+    """
+    Return the sorted corpus-relative paths of every .html file under
+    `directory`, using `/` as the separator.
+    """
+    pages = []
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        relative = os.path.relpath(root, directory)
+        for filename in files:
+            if filename.endswith(".html"):
+                path = filename if relative == "." else os.path.join(relative, filename)
+                pages.append(path.replace(os.sep, "/"))
+    pages.sort()
+    return pages
+
+
+def crawl_links(directory, processes=None):
+    """
+    Return a dictionary mapping every page under `directory` to the set
+    of other pages in the corpus it links to.
+
+    Pages are parsed on a process pool when there are enough of them
+    to be worth it, or in this process when `processes` is 1.
+    """
+    pages = list_pages(directory)
+    if processes == 1 or len(pages) <= CHUNKSIZE:
+        results = [extract_links(directory, page) for page in pages]
+    else:
+        with concurrent.futures.ProcessPoolExecutor(processes) as pool:
+            results = list(pool.map(
+                extract_links, [directory] * len(pages), pages,
+                chunksize=CHUNKSIZE))
+    known = set(pages)
+    return {
+        page: {link for link in links if link in known and link != page}
+        for page, links in zip(pages, results)
+    }
+
+
+def to_csr(pages, corpus):
+    """
+    Return (offsets, links) such that the indices into `pages` of the
+    pages that page `i` links to are `links[offsets[i]:offsets[i + 1]]`.
+    """
+    index = {page: i for i, page in enumerate(pages)}
+    offsets = np.zeros(len(pages) + 1, dtype=np.int64)
+    links = []
+    for i, page in enumerate(pages):
+        links.extend(sorted(index[link] for link in corpus[page]))
+        offsets[i + 1] = len(links)
+    return offsets, np.array(links, dtype=np.int64)
+
+
+def corpus_key(directory, pages):
+    """
+    Return the name, size and mtime of every page, which the adjacency
+    file is keyed on. Names are included since renaming a page keeps
+    its size and mtime.
+    """
+    key = []
+    for page in pages:
+        st = os.stat(os.path.join(directory, *page.split("/")))
+        key.append([page, st.st_size, st.st_mtime_ns])
+    return key
+
+
+def save_adjacency(path, key, pages, offsets, links):
+    """
+    Write a CSR link graph to `path`: a magic string, the length of a
+    JSON header holding `key` and the page names, then int64 offsets
+    and int32 links, each aligned to 8 bytes.
+    """
+    header = json.dumps({
+        "version": ADJACENCY_VERSION,
+        "key": key,
+        "pages": pages,
+        "links": len(links),
+    }).encode("utf-8")
+    header += b" " * ((-len(header) - len(ADJACENCY_MAGIC) - 4) % 8)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(ADJACENCY_MAGIC)
+        f.write(struct.pack("<I", len(header)))
+        f.write(header)
+        f.write(np.asarray(offsets, dtype="<i8").tobytes())
+        f.write(np.asarray(links, dtype="<i4").tobytes())
+    os.replace(tmp, path)
+
+
+def load_adjacency(path, key=None):
+    """
+    Memory-map a link graph written by `save_adjacency`, returning
+    (pages, offsets, links), or None if the file is missing, corrupt
+    or was written with a different `key`.
+    """
+    try:
+        with open(path, "rb") as f:
+            if f.read(len(ADJACENCY_MAGIC)) != ADJACENCY_MAGIC:
+                return None
+            (length,) = struct.unpack("<I", f.read(4))
+            header = json.loads(f.read(length))
+    except (OSError, ValueError, struct.error):
+        return None
+    try:
+        if header.get("version") != ADJACENCY_VERSION:
+            return None
+        if key is not None and header.get("key") != key:
+            return None
+        pages = header["pages"]
+        start = len(ADJACENCY_MAGIC) + 4 + length
+        end = start + 8 * (len(pages) + 1) + 4 * header["links"]
+        if os.path.getsize(path) != end:
+            return None
+        offsets = np.memmap(path, dtype="<i8", mode="r", offset=start,
+                            shape=(len(pages) + 1,))
+        if header["links"] == 0:
+            # An empty region cannot be memory-mapped
+            links = np.zeros(0, dtype="<i4")
+        else:
+            links = np.memmap(path, dtype="<i4", mode="r",
+                              offset=start + 8 * (len(pages) + 1),
+                              shape=(header["links"],))
+    except (AttributeError, KeyError, TypeError, ValueError, OSError):
+        return None
+    return pages, offsets, links
+
+
+def load_or_crawl(directory, processes=None):
+    """
+    Return (pages, offsets, links) for a corpus as in
+    `pagerank.link_arrays`, memory-mapped from the adjacency file in
+    `directory` if it is up to date, or crawled and saved there if not.
+    """
+    path = os.path.join(directory, ADJACENCY_NAME)
+    pages = list_pages(directory)
+    key = corpus_key(directory, pages)
+    adjacency = load_adjacency(path, key)
+    if adjacency is not None:
+        return adjacency
+    offsets, links = to_csr(pages, crawl_links(directory, processes))
+    try:
+        save_adjacency(path, key, pages, offsets, links)
+    except OSError:
+        pass
+    return pages, offsets, links
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+import os
+import sys
+
+import numpy as np
+
+from crawler import load_or_crawl
+from pagerank import (CONVERGE_THRESHOLD, DAMPING, power_iteration,
+                      transition_matrix)
+
+STATE_NAME = "pagerank.state.npz"
+
+# Most sweeps local_sweeps makes before handing over
+MAX_SWEEPS = 100
+
+
+def main():
+    if len(sys.argv) == 3 and sys.argv[2] == "--local":
+        local = True
+    elif len(sys.argv) == 2:
+        local = False
+    else:
+        sys.exit("Usage: python incremental.py corpus [--local]")
+    directory = sys.argv[1]
+
+    path = os.path.join(directory, STATE_NAME)
+    pages, offsets, links = load_or_crawl(directory)
+    result = update_pagerank(pages, offsets, links, DAMPING, load_state(path),
+                             local)
+    save_state(path, result.state)
+
+    if result.changed is None:
+        print(f"No saved state, solved from scratch "
+              f"in {result.iterations} iterations.")
+    else:
+        print(f"{len(result.changed)} pages changed, converged "
+              f"in {result.local_sweeps} local sweeps and "
+              f"{result.iterations} iterations.")
+    for page, rank in zip(result.state.pages, result.state.ranks):
+        print(f"  {page}: {rank:.4f}")
+
+
+class State():
+    """
+    A link graph in CSR form with the PageRank vector solved for it.
+    """
+
+    def __init__(self, pages, offsets, links, ranks, damping_factor):
+        self.pages = pages
+        self.offsets = offsets
+        self.links = links
+        self.ranks = ranks
+        self.damping_factor = damping_factor
+
+
+class Update():
+    """
+    The outcome of `update_pagerank`: the new State, the indices of the
+    pages whose links changed (None without a previous state), and the
+    work it took.
+    """
+
+    def __init__(self, state, changed, local_sweeps, iterations):
+        self.state = state
+        self.changed = changed
+        self.local_sweeps = local_sweeps
+        self.iterations = iterations
+
+
+def save_state(path, state):
+    np.savez(path, pages=np.array(state.pages, dtype=str),
+             offsets=state.offsets, links=state.links, ranks=state.ranks,
+             damping_factor=state.damping_factor)
+
+
+def load_state(path):
+    """
+    Return the State saved at `path`, or None if there is none.
+    """
+    try:
+        with np.load(path, allow_pickle=False) as data:
+            return State(data["pages"].tolist(), data["offsets"],
+                         data["links"], data["ranks"],
+                         float(data["damping_factor"]))
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def changed_pages(old, pages, offsets, links):
+    """
+    Return the sorted indices into `pages` of every page whose rank
+    the edit from `old` directly disturbs: pages that are new, whose
+    links changed, or that lost a link from a removed page.
+    """
+    old_index = {page: i for i, page in enumerate(old.pages)}
+    new_index = {page: i for i, page in enumerate(pages)}
+    changed = set()
+    for i, page in enumerate(pages):
+        j = old_index.get(page)
+        new_links = {pages[k] for k in links[offsets[i]:offsets[i + 1]]}
+        if j is None:
+            changed.add(i)
+            continue
+        old_links = {old.pages[k] for k in old.links[old.offsets[j]:old.offsets[j + 1]]}
+        if new_links != old_links:
+            changed.add(i)
+            changed.update(new_index[p] for p in new_links ^ old_links
+                           if p in new_index)
+    for page, j in old_index.items():
+        if page not in new_index:
+            for k in old.links[old.offsets[j]:old.offsets[j + 1]]:
+                if old.pages[k] in new_index:
+                    changed.add(new_index[old.pages[k]])
+    return np.array(sorted(changed), dtype=np.int64)
+
+
+def warm_start(old, pages):
+    """
+    Return the previous ranks carried over to `pages`, with new pages
+    starting at 1/N, normalized to sum to 1.
+    """
+    old_index = {page: i for i, page in enumerate(old.pages)}
+    ranks = np.full(len(pages), 1 / len(pages))
+    for i, page in enumerate(pages):
+        j = old_index.get(page)
+        if j is not None:
+            ranks[i] = old.ranks[j]
+    return ranks / ranks.sum()
+
+
+def local_sweeps(matrix, dangling, offsets, links, damping_factor, ranks,
+                 changed, threshold=CONVERGE_THRESHOLD):
+    """
+    Update `ranks` in place, recomputing only the `changed` pages and
+    the pages they link to, and spreading further only from pages
+    whose rank still moves. Return the number of sweeps.
+
+    Every other page keeps its rank, so this only settles the region
+    around an edit; a global power iteration must finish the job.
+    """
+    n = len(ranks)
+    active = np.zeros(n, dtype=bool)
+    active[changed] = True
+    active[_out_links(offsets, links, changed)] = True
+    sweeps = 0
+    while sweeps < MAX_SWEEPS:
+        rows = np.flatnonzero(active)
+        sweeps += 1
+        dangling_rank = ranks[dangling].sum()
+        updated = damping_factor * (matrix[rows] @ ranks)
+        updated += (1 - damping_factor + damping_factor * dangling_rank) / n
+        delta = np.abs(updated - ranks[rows])
+        ranks[rows] = updated
+        if delta.sum() < threshold:
+            break
+        moving = rows[delta > threshold / len(rows)]
+        active[:] = False
+        active[moving] = True
+        active[_out_links(offsets, links, moving)] = True
+    return sweeps
+
+
+def _out_links(offsets, links, pages):
+    """
+    Return the concatenated out-links of every page in `pages`.
+    """
+    starts = offsets[pages]
+    lengths = offsets[pages + 1] - starts
+    total = lengths.sum()
+    if total == 0:
+        return np.zeros(0, dtype=np.int64)
+    shifts = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+    return links[shifts + np.arange(total)]
+
+
+def update_pagerank(pages, offsets, links, damping_factor, previous=None,
+                    local=False, threshold=CONVERGE_THRESHOLD):
+    """
+    Return an Update with the PageRank of the CSR link graph `pages`,
+    `offsets`, `links`, reusing the `previous` State if there is one.
+
+    Power iteration warm-starts from the previous ranks, which are
+    already close to the answer when only a few pages changed. With
+    `local`, the region around the changed pages is settled first by
+    `local_sweeps`, so the global iteration has even less left to do.
+    """
+    matrix, dangling = transition_matrix(offsets, links)
+    if previous is None or previous.damping_factor != damping_factor:
+        ranks, iterations = power_iteration(
+            matrix, dangling, damping_factor, threshold=threshold)
+        state = State(pages, offsets, links, ranks, damping_factor)
+        return Update(state, None, 0, iterations)
+
+    changed = changed_pages(previous, pages, offsets, links)
+    ranks = warm_start(previous, pages)
+    sweeps = 0
+    if local and len(changed):
+        sweeps = local_sweeps(matrix, dangling, offsets, links,
+                              damping_factor, ranks, changed, threshold)
+    ranks, iterations = power_iteration(
+        matrix, dangling, damping_factor, ranks, threshold)
+    state = State(pages, offsets, links, ranks, damping_factor)
+    return Update(state, changed, sweeps, iterations)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+import concurrent.futures
+import os
+import sys
+
+import numpy as np
+
+from crawler import load_or_crawl
+from pagerank import DAMPING, random_surfer
+
+# Samples drawn by one task on one worker
+BATCH = 100000
+
+# Largest total number of samples before giving up on the tolerance
+MAX_SAMPLES = 10 ** 8
+
+# Half-width of the confidence interval every page must reach
+TOLERANCE = 0.001
+
+# Fewest batches whose spread is trusted as an error estimate
+MIN_BATCHES = 8
+
+# Normal quantile for a 95% confidence interval
+Z = 1.96
+
+# Links of the corpus, set in each worker process by _init_worker
+_links = None
+
+
+def main():
+    if len(sys.argv) not in (2, 3):
+        sys.exit("Usage: python montecarlo.py corpus [tolerance]")
+    pages, offsets, links = load_or_crawl(sys.argv[1])
+    tolerance = float(sys.argv[2]) if len(sys.argv) == 3 else TOLERANCE
+    result = parallel_pagerank(pages, offsets, links, DAMPING, tolerance)
+    print(f"PageRank Results from {result.samples} samples "
+          f"in {result.batches} batches (seed {result.seed})")
+    for page in sorted(result.ranks):
+        print(f"  {page}: {result.ranks[page]:.4f} "
+              f"± {Z * result.errors[page]:.4f}")
+    if not result.converged:
+        print(f"Stopped at {result.samples} samples before every interval "
+              f"was within {tolerance}.")
+
+
+class SamplingResult():
+    """
+    Merged visit frequencies from many independent walker batches.
+
+    `ranks` and `errors` map each page to its estimated PageRank and
+    that estimate's standard error. `seed` reproduces the run.
+    """
+
+    def __init__(self, ranks, errors, samples, batches, seed, converged):
+        self.ranks = ranks
+        self.errors = errors
+        self.samples = samples
+        self.batches = batches
+        self.seed = seed
+        self.converged = converged
+
+
+def parallel_pagerank(pages, offsets, links, damping_factor,
+                      tolerance=TOLERANCE, max_samples=MAX_SAMPLES,
+                      batch=BATCH, processes=None, seed=None):
+    """
+    Estimate PageRank of the CSR link graph `pages`, `offsets`, `links`
+    with batches of random surfers spread over a process pool,
+    returning a SamplingResult.
+
+    Batch `i` always draws from the seed sequence spawned with key `i`
+    from `seed`, so a run with the same seed gives the same result on
+    any number of processes. The standard error of each page comes
+    from the spread of its per-batch frequencies (batch means).
+    Sampling stops once every page's 95% interval half-width is within
+    `tolerance`, or after `max_samples`.
+    """
+    if processes is None:
+        processes = os.cpu_count() or 1
+    root = np.random.SeedSequence(seed)
+
+    total = np.zeros(len(pages))
+    total_squares = np.zeros(len(pages))
+    batches = 0
+    converged = False
+    with concurrent.futures.ProcessPoolExecutor(
+            processes, initializer=_init_worker,
+            initargs=(offsets, links, damping_factor)) as pool:
+        max_batches = max(2, max_samples // batch)
+        while batches < max_batches:
+            round_size = min(processes, max_batches - batches)
+            keys = range(batches, batches + round_size)
+            seeds = [np.random.SeedSequence(root.entropy, spawn_key=(key,))
+                     for key in keys]
+            # Merge in key order and test after every batch, so where the
+            # run stops does not depend on the number of processes
+            for visits in pool.map(_sample_batch, seeds, [batch] * round_size):
+                frequencies = visits / batch
+                total += frequencies
+                total_squares += frequencies ** 2
+                batches += 1
+                errors = _standard_errors(total, total_squares, batches)
+                if batches >= MIN_BATCHES and np.all(Z * errors <= tolerance):
+                    converged = True
+                    break
+            if converged:
+                break
+
+    ranks = total / batches
+    errors = _standard_errors(total, total_squares, batches)
+    return SamplingResult(
+        dict(zip(pages, ranks.tolist())), dict(zip(pages, errors.tolist())),
+        batches * batch, batches, root.entropy, converged)
+
+
+def _standard_errors(total, total_squares, batches):
+    """
+    Return the standard error of the mean of `batches` per-batch
+    frequencies, given their sums and sums of squares.
+    """
+    if batches < 2:
+        return np.full(len(total), np.inf)
+    mean = total / batches
+    variance = np.maximum(total_squares / batches - mean ** 2, 0)
+    return np.sqrt(variance * batches / (batches - 1) / batches)
+
+
+def _init_worker(offsets, links, damping_factor):
+    global _links
+    _links = (offsets, links, damping_factor)
+
+
+def _sample_batch(seed, n):
+    offsets, links, damping_factor = _links
+    return random_surfer(offsets, links, damping_factor, n,
+                         rng=np.random.default_rng(seed))
+
+
+if __name__ == "__main__":
+    main()
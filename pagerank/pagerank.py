@@ -1,25 +1,31 @@
-import os
-import random
-import re
 import sys
 
+import numpy as np
+import scipy.sparse
+
+from crawler import load_or_crawl, to_csr
+
 DAMPING = 0.85
 SAMPLES = 10000
+WALKERS = 1024
+# Fewest steps each walker takes, to keep the random start's bias small
+WALK_LENGTH = 1000
 CONVERGE_THRESHOLD = 0.001
 
 
 def main():
     if len(sys.argv) != 2:
         sys.exit("Usage: python pagerank.py corpus")
-    corpus = crawl(sys.argv[1])
-    ranks = sample_pagerank(corpus, DAMPING, SAMPLES)
+    pages, offsets, links = load_or_crawl(sys.argv[1])
+    visits = random_surfer(offsets, links, DAMPING, SAMPLES)
     print(f"PageRank Results from Sampling (n = {SAMPLES})")
-    for page in sorted(ranks):
-        print(f"  {page}: {ranks[page]:.4f}")
-    ranks = iterate_pagerank(corpus, DAMPING)
+    for page, count in zip(pages, visits.tolist()):
+        print(f"  {page}: {count / SAMPLES:.4f}")
+    matrix, dangling = transition_matrix(offsets, links)
+    ranks, _ = power_iteration(matrix, dangling, DAMPING)
     print(f"PageRank Results from Iteration")
-    for page in sorted(ranks):
-        print(f"  {page}: {ranks[page]:.4f}")
+    for page, rank in zip(pages, ranks.tolist()):
+        print(f"  {page}: {rank:.4f}")
 
 
 def crawl(directory):
@@ -28,25 +34,11 @@ def crawl(directory):
     Return a dictionary where each key is a page, and values are
     a list of all other pages in the corpus that are linked to by the page.
     """
-    pages = dict()
-
-    # Extract all links from HTML files
-    for filename in os.listdir(directory):
-        if not filename.endswith(".html"):
-            continue
-        with open(os.path.join(directory, filename)) as f:
-            contents = f.read()
-            links = re.findall(r"<a\s+(?:[^>]*?)href=\"([^\"]*)\"", contents)
-            pages[filename] = set(links) - {filename}
-
-    # Only include links to other pages in the corpus
-    for filename in pages:
-        pages[filename] = set(
-            link for link in pages[filename]
-            if link in pages
-        )
-
-    return pages
+    pages, offsets, links = load_or_crawl(directory)
+    return {
+        page: {pages[j] for j in links[offsets[i]:offsets[i + 1]]}
+        for i, page in enumerate(pages)
+    }
 
 
 def transition_model(corpus, page, damping_factor):
@@ -81,27 +73,45 @@ def sample_pagerank(corpus, damping_factor, n):
     their estimated PageRank value (a value between 0 and 1). All
     PageRank values should sum to 1.
     """
-    len_corpus = len(corpus)
-    times_visited = {}  # dictionary storing number of times each page is visited
-    PR = {}  # dictionary storing PR value of each page
-    # initialize number of visiting of every page to zero 
-    for page in corpus.keys():
-        times_visited[page] = 0
-    # random number of first page visited
-    first_page_number = random.randint(0, len_corpus-1)
-    current_page = list(corpus.keys())[first_page_number]
-    times_visited[current_page] += 1
-    # iterate n times to get n samples, adding to times_visited every time any page is visited
-    for i in range(n):
-        transition_dp = transition_model(corpus, current_page, damping_factor)
-        pages = list(transition_dp.keys())
-        weights = list(transition_dp.values())
-        current_page = random.choices(pages, weights=weights)[0]
-        times_visited[current_page] += 1
-    # calculating PR values for each page 
-    for page in times_visited.keys():
-        PR[page] = times_visited[page]/n
-    return PR
+    pages, offsets, links = link_arrays(corpus)
+    visits = random_surfer(offsets, links, damping_factor, n)
+    return dict(zip(pages, (visits / n).tolist()))
+
+
+def random_surfer(offsets, links, damping_factor, n, walkers=WALKERS,
+                  rng=None):
+    """
+    Return an array counting how often each page is visited in `n`
+    samples of the random surfer, over CSR out-links `offsets`/`links`.
+
+    Runs up to `walkers` independent surfers side by side, each
+    starting on a random page and taking at least WALK_LENGTH steps,
+    so every step is a handful of NumPy operations over the batch.
+    Each draw is O(1): a surfer follows a uniformly chosen link with
+    probability `damping_factor` (looked up by offset into its page's
+    links), or else jumps to a uniformly chosen page, as it always
+    does from a page with no links.
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+    num_pages = len(offsets) - 1
+    out_degree = np.diff(offsets)
+    visits = np.zeros(num_pages, dtype=np.int64)
+    walkers = max(1, min(walkers, n // WALK_LENGTH))
+    current = rng.integers(num_pages, size=walkers)
+    remaining = n
+    while remaining > 0:
+        taken = min(walkers, remaining)
+        visits += np.bincount(current[:taken], minlength=num_pages)
+        remaining -= taken
+        degree = out_degree[current]
+        follow = (rng.random(walkers) < damping_factor) & (degree > 0)
+        choice = offsets[current[follow]] + (
+            rng.random(follow.sum()) * degree[follow]).astype(np.int64)
+        current = rng.integers(num_pages, size=walkers)
+        current[follow] = links[choice]
+    return visits
+
 
 def iterate_pagerank(corpus, damping_factor):
     """
@@ -112,44 +122,70 @@ def iterate_pagerank(corpus, damping_factor):
     their estimated PageRank value (a value between 0 and 1). All
     PageRank values should sum to 1.
     """
-    PR = {}
-    new_PR = {}
-    steps = {}  # stroing difference of PR values between each iteration 
-    linking_pages = {}  # dictionary storing pages linking to the key page
-    corpus_len = len(corpus)
-    # initializing PR value of every page to 1/N
-    for page in corpus.keys():
-        PR[page] = 1/corpus_len
-    # setting values of linking_pages to a set for every key page
-    for page in corpus.keys():
-        linking_pages[page] = set()
-    # setting linking_pages (stores pages linking to the key page) from corpus
-    for page in corpus.keys():
-        for linked_page in corpus[page]:
-            linking_pages[linked_page].add(page)
+    pages, matrix, dangling = link_matrix(corpus)
+    ranks, _ = power_iteration(matrix, dangling, damping_factor)
+    return dict(zip(pages, ranks.tolist()))
+
+
+def link_matrix(corpus):
+    """
+    Return (pages, matrix, dangling) for a corpus.
+
+    `pages` is the sorted list of page names. `matrix` is an N x N
+    sparse CSR matrix where `matrix[i, j]` is the probability that a
+    surfer on page j follows a link to page i, and `dangling` is a
+    boolean array marking pages with no links, whose columns are empty.
+    """
+    pages, offsets, links = link_arrays(corpus)
+    matrix, dangling = transition_matrix(offsets, links)
+    return pages, matrix, dangling
+
+
+def transition_matrix(offsets, links):
+    """
+    Return (matrix, dangling) as in `link_matrix` for CSR out-links.
+    """
+    n = len(offsets) - 1
+    out_degree = np.diff(offsets)
+    sources = np.repeat(np.arange(n), out_degree)
+    matrix = scipy.sparse.csr_matrix(
+        (1 / out_degree[sources], (links, sources)), shape=(n, n))
+    return matrix, out_degree == 0
+
+
+def link_arrays(corpus):
+    """
+    Return (pages, offsets, links) for a corpus, where `pages` is the
+    sorted list of page names and the indices of the pages that page
+    `i` links to are `links[offsets[i]:offsets[i + 1]]`.
+    """
+    pages = sorted(corpus)
+    offsets, links = to_csr(pages, corpus)
+    return pages, offsets, links
+
+
+def power_iteration(matrix, dangling, damping_factor, ranks=None,
+                    threshold=CONVERGE_THRESHOLD):
+    """
+    Return (ranks, iterations): the PageRank vector for a link matrix
+    by power iteration, starting from `ranks` (uniform by default), and
+    the number of iterations it took.
+
+    A surfer on a dangling page jumps to any page uniformly. Stops once
+    the L1 distance between successive vectors is below `threshold`.
+    """
+    n = matrix.shape[0]
+    if ranks is None:
+        ranks = np.full(n, 1 / n)
+    iterations = 0
     while True:
-        check = True  # for threashold checking
-        # initializing first condition (1-d)/N
-        for page in corpus.keys():
-            steps[page] = False
-            linked_pages = linking_pages[page]
-            new_PR[page] = (1-damping_factor)/corpus_len
-            # looping through all linking pages
-            for linked_page in linked_pages:
-                linked_pages_len = len(corpus[linked_page])
-                new_PR[page] += damping_factor * PR[linked_page]/linked_pages_len
-        # check if threashold is met
-        for page in corpus.keys():
-            if new_PR[page] - PR[page] < CONVERGE_THRESHOLD:
-                steps[page] = True
-            check = check and steps[page]
-            if check == False:
-                break
-        # if the threashould is not crossed by any page's PR value, break out of loop
-        PR = new_PR.copy()
-        if check == True:
-            break
-    return PR
+        iterations += 1
+        dangling_rank = ranks[dangling].sum()
+        new_ranks = damping_factor * (matrix @ ranks)
+        new_ranks += (1 - damping_factor + damping_factor * dangling_rank) / n
+        if np.abs(new_ranks - ranks).sum() < threshold:
+            return new_ranks, iterations
+        ranks = new_ranks
 
 
 if __name__ == "__main__":
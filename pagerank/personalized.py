@@ -0,0 +1,100 @@
+import sys
+
+import numpy as np
+import scipy.sparse
+
+from crawler import load_or_crawl
+from pagerank import CONVERGE_THRESHOLD, DAMPING, transition_matrix
+
+# Number of results returned per seed set
+TOP_K = 5
+
+# Seed sets solved together in one block of the power iteration
+BLOCK = 64
+
+
+def main():
+    if len(sys.argv) < 3:
+        sys.exit("Usage: python personalized.py corpus seed[,seed...] ...")
+    pages, offsets, links = load_or_crawl(sys.argv[1])
+    seed_sets = [arg.split(",") for arg in sys.argv[2:]]
+    matrix, dangling = transition_matrix(offsets, links)
+    try:
+        teleport = teleport_matrix(pages, seed_sets)
+    except ValueError as e:
+        sys.exit(str(e))
+    results = top_k_pagerank(matrix, dangling, DAMPING, teleport, TOP_K)
+    for seeds, top in zip(seed_sets, results):
+        print(f"Personalized PageRank for {', '.join(seeds)}")
+        for i, rank in top:
+            print(f"  {pages[i]}: {rank:.4f}")
+
+
+def teleport_matrix(pages, seed_sets):
+    """
+    Return a sparse N x S matrix whose column `s` is the uniform
+    distribution over the pages in `seed_sets[s]`.
+    """
+    index = {page: i for i, page in enumerate(pages)}
+    rows, columns, values = [], [], []
+    for s, seeds in enumerate(seed_sets):
+        try:
+            seeds = sorted({index[page] for page in seeds})
+        except KeyError as e:
+            raise ValueError(f"Seed page {e.args[0]} is not in the corpus.")
+        if not seeds:
+            raise ValueError("Every seed set needs at least one page.")
+        rows.extend(seeds)
+        columns.extend([s] * len(seeds))
+        values.extend([1 / len(seeds)] * len(seeds))
+    return scipy.sparse.csc_matrix(
+        (values, (rows, columns)), shape=(len(pages), len(seed_sets)))
+
+
+def batched_pagerank(matrix, dangling, damping_factor, teleport,
+                     threshold=CONVERGE_THRESHOLD):
+    """
+    Return a dense N x S matrix whose column `s` is the PageRank vector
+    that teleports according to column `s` of `teleport`.
+
+    All columns are iterated together, so every step is one sparse by
+    dense product. A surfer on a dangling page, like one who teleports,
+    jumps according to their own column. Stops once every column's L1
+    change is below `threshold`.
+    """
+    teleport = teleport.toarray() if scipy.sparse.issparse(teleport) else teleport
+    ranks = teleport.copy()
+    while True:
+        jump = (1 - damping_factor) + damping_factor * ranks[dangling].sum(axis=0)
+        new_ranks = damping_factor * (matrix @ ranks) + teleport * jump
+        if np.abs(new_ranks - ranks).sum(axis=0).max() < threshold:
+            return new_ranks
+        ranks = new_ranks
+
+
+def top_k_pagerank(matrix, dangling, damping_factor, teleport, k=TOP_K,
+                   block=BLOCK, threshold=CONVERGE_THRESHOLD):
+    """
+    Return, for each column of `teleport`, the `k` highest-ranked
+    (page index, rank) pairs of its personalized PageRank.
+
+    Columns are solved BLOCK at a time and only their top k are kept,
+    so memory stays at N x BLOCK however many seed sets there are.
+    """
+    teleport = scipy.sparse.csc_matrix(teleport)
+    k = min(k, matrix.shape[0])
+    results = []
+    for start in range(0, teleport.shape[1], block):
+        ranks = batched_pagerank(
+            matrix, dangling, damping_factor,
+            teleport[:, start:start + block], threshold)
+        top = np.argpartition(-ranks, k - 1, axis=0)[:k]
+        for s in range(ranks.shape[1]):
+            column = top[:, s]
+            column = column[np.argsort(-ranks[column, s], kind="stable")]
+            results.append([(int(i), float(ranks[i, s])) for i in column])
+    return results
+
+
+if __name__ == "__main__":
+    main()